@@ -1,14 +1,26 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import multiprocessing
 import os
+import threading
+import time
+from .cache import TTLCache
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# Decoded claims per token, so repeated requests skip the signature check
+token_cache = TTLCache(maxsize=4096, ttl=float(os.getenv("TOKEN_CACHE_SECONDS", "300")))
+
+# Authenticated users by username, so protected requests skip the users query
+user_cache = TTLCache(maxsize=256, ttl=float(os.getenv("USER_CACHE_SECONDS", "60")))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,6 +32,118 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
+# bcrypt costs a few hundred milliseconds of CPU per call. Running it in the
+# request threadpool lets a burst of logins starve every other request, so
+# hashing and verification go to a small dedicated process pool instead.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+
+# Password checks allowed to run or wait for a worker; beyond that, logins
+# are shed with a 429 rather than queued
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 4)))
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool already has PASSWORD_QUEUE_LIMIT calls pending."""
+
+_password_pool = None
+_password_pool_lock = threading.Lock()
+_password_pending = 0
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is None:
+            # Forking a process that runs threads is unsafe, start workers fresh
+            _password_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _password_pool
+
+def _acquire_password_slot():
+    global _password_pending
+    with _password_pool_lock:
+        if _password_pending >= PASSWORD_QUEUE_LIMIT:
+            raise PasswordPoolBusy()
+        _password_pending += 1
+
+def _release_password_slot():
+    global _password_pending
+    with _password_pool_lock:
+        _password_pending -= 1
+
+async def _run_password_task(fn, *args):
+    _acquire_password_slot()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_password_pool(), fn, *args)
+    finally:
+        _release_password_slot()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the password pool; raises PasswordPoolBusy when it is full."""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+def hash_password(password: str) -> str:
+    """Hash a password in the password pool, from sync code; raises PasswordPoolBusy when it is full."""
+    _acquire_password_slot()
+    try:
+        return _get_password_pool().submit(get_password_hash, password).result()
+    finally:
+        _release_password_slot()
+
+def shutdown_password_pool():
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is not None:
+            _password_pool.shutdown(cancel_futures=True)
+            _password_pool = None
+
+def password_pool_stats() -> dict:
+    with _password_pool_lock:
+        return {
+            "workers": PASSWORD_WORKERS,
+            "pending": _password_pending,
+            "queue_limit": PASSWORD_QUEUE_LIMIT,
+        }
+
+class LoginThrottle:
+    """Sliding-window limit of login attempts per key (client IP or username)."""
+
+    def __init__(self, limit: int, window: float, maxsize: int = 10000):
+        self.limit = limit
+        self.window = window
+        self._attempts = TTLCache(maxsize=maxsize, ttl=window)
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: str) -> Optional[int]:
+        """Seconds until ``key`` may try again, None if it is not throttled."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = [t for t in self._attempts.get(key, ()) if t > now - self.window]
+            if len(attempts) < self.limit:
+                return None
+            return int(attempts[-self.limit] + self.window - now) + 1
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            attempts = [t for t in self._attempts.get(key, ()) if t > now - self.window]
+            attempts.append(now)
+            self._attempts.set(key, attempts[-self.limit:])
+
+    def reset(self, key: str):
+        with self._lock:
+            self._attempts.pop(key)
+
+# Every login attempt counts against the client IP, failed ones against the username
+login_ip_throttle = LoginThrottle(
+    limit=int(os.getenv("LOGIN_IP_LIMIT", "20")),
+    window=float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "60"))
+)
+login_user_throttle = LoginThrottle(
+    limit=int(os.getenv("LOGIN_USER_LIMIT", "5")),
+    window=float(os.getenv("LOGIN_USER_WINDOW_SECONDS", "300"))
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -34,11 +158,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        expires_at, token_data = cached
+        if expires_at is None or expires_at > time.time():
+            return token_data
+        token_cache.pop(token)
+        return None
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             return None
-        return {"username": username}
+        token_data = {"username": username}
+        token_cache.set(token, (payload.get("exp"), token_data))
+        return token_data
     except JWTError:
         return None
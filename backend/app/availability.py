@@ -0,0 +1,143 @@
+"""
+In-process index of the BDs that are currently rented out.
+
+Knowing whether a BD is out means looking for an open rental
+(``fin IS NULL``) in ``locations``. This module keeps the open rentals in
+memory as a ``bid -> (lid, mid)`` map. It is loaded at startup and updated
+by the rent and return endpoints once their transaction has committed, so
+the public catalogue can hide rented BDs without a query.
+
+Rentals changed by another worker process or directly in the database are
+picked up when the index is reconciled, which happens every
+``RECONCILE_SECONDS`` (see ``reconcile_forever``). Until then the index can
+be stale, so it only ever annotates reads: renting is decided by the
+database (the unique ``open_bid`` index), and the admin desk listing reads
+the rental status from ``locations``.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import run_db
+
+RECONCILE_SECONDS = int(os.getenv("AVAILABILITY_RECONCILE_SECONDS", "60"))
+
+
+class AvailabilityIndex:
+    """Map of the open rentals, keyed by ``bid``."""
+
+    def __init__(self, reconcile_seconds: int = RECONCILE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.RLock()
+        self._rentals: Dict[int, Tuple[int, int]] = {}
+        self._loaded_at: Optional[float] = None
+        self.reconciliations = 0
+        self.drift = 0
+
+    def load(self, db: Session) -> int:
+        """(Re)build the index from ``locations``; returns how many entries changed."""
+        rows = db.query(
+            models.Locations.lid,
+            models.Locations.bid,
+            models.Locations.mid
+        ).filter(
+            models.Locations.fin.is_(None)
+        ).order_by(
+            models.Locations.lid
+        ).all()
+        # A BD should only have one open rental; keep the latest if not
+        rentals = {bid: (lid, mid) for lid, bid, mid in rows}
+        with self._lock:
+            changed = 0
+            if self._loaded_at is not None:
+                changed = sum(
+                    1 for bid in rentals.keys() | self._rentals.keys()
+                    if rentals.get(bid) != self._rentals.get(bid)
+                )
+                self.reconciliations += 1
+                self.drift += changed
+            self._rentals = rentals
+            self._loaded_at = time.monotonic()
+            return changed
+
+    def _ensure_loaded(self, db: Session):
+        with self._lock:
+            if self._loaded_at is None:
+                self.load(db)
+
+    def rental(self, db: Session, bid: int) -> Optional[Tuple[int, int]]:
+        """Return the ``(lid, mid)`` of the open rental of a BD, if any."""
+        self._ensure_loaded(db)
+        with self._lock:
+            return self._rentals.get(bid)
+
+    def rentals(self, db: Session, bids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+        """Return the open rentals among ``bids``."""
+        self._ensure_loaded(db)
+        with self._lock:
+            return {bid: self._rentals[bid] for bid in bids if bid in self._rentals}
+
+    def rented_bids(self, db: Session) -> Set[int]:
+        """Return the bids of all BDs currently rented out."""
+        self._ensure_loaded(db)
+        with self._lock:
+            return set(self._rentals)
+
+    def rent(self, bid: int, lid: int, mid: int):
+        """Record a committed rental."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._rentals[bid] = (lid, mid)
+
+    def refresh(self, db: Session, bid: int) -> Optional[Tuple[int, int]]:
+        """Re-read the open rental of one BD, e.g. after a checkout lost a race for it."""
+        row = db.query(models.Locations.lid, models.Locations.mid).filter(
+            models.Locations.bid == bid,
+            models.Locations.fin.is_(None)
+        ).first()
+        rental = None if row is None else (row.lid, row.mid)
+        with self._lock:
+            if self._loaded_at is not None:
+                if rental is None:
+                    self._rentals.pop(bid, None)
+                else:
+                    self._rentals[bid] = rental
+        return rental
+
+    def release(self, bid: int, lid: int):
+        """Record a committed return."""
+        with self._lock:
+            if self._rentals.get(bid, (None,))[0] == lid:
+                del self._rentals[bid]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rented": len(self._rentals),
+                "loaded": self._loaded_at is not None,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "reconciliations": self.reconciliations,
+                "drift": self.drift,
+            }
+
+
+availability_index = AvailabilityIndex()
+
+
+async def reconcile_forever(index: AvailabilityIndex = availability_index):
+    """Reload the index from the database every ``reconcile_seconds``."""
+    while True:
+        await asyncio.sleep(index.reconcile_seconds)
+        try:
+            changed = await run_db(index.load)
+        except Exception as e:
+            print(f"Availability reconcile failed: {e}")
+            continue
+        if changed:
+            print(f"Availability index reconciled, {changed} entries were out of date")
@@ -0,0 +1,159 @@
+"""
+Bulk import of BDs from CSV or NDJSON.
+
+Adding albums one by one through ``POST /admin/bds/`` costs a uniqueness
+query, an insert and a commit per album. An import instead reads the upload
+as a stream of lines, validates every row with ``schemas.BDCreate`` and
+handles the valid rows in batches: one ``cote IN (...)`` query checks a whole
+batch for duplicates, the new rows are inserted with a single executemany,
+and each batch is committed on its own so a large file never holds one long
+transaction.
+"""
+
+import csv
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import String, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models, schemas, stats
+
+FORMATS = ("csv", "ndjson")
+
+# Columns a row may set, everything else in the upload is ignored
+IMPORT_FIELDS = tuple(schemas.BDCreate.model_fields)
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    """Guess the upload format from its Content-Type header."""
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json" in content_type:
+        return "ndjson"
+    return None
+
+
+# Text columns that cannot be NULL; the dumps hold empty strings in them
+# (e.g. albums without a series), which are kept as they are
+REQUIRED_TEXT_FIELDS = frozenset(
+    column.key for column in models.BD.__table__.c
+    if column.key in IMPORT_FIELDS and not column.nullable and isinstance(column.type, String)
+)
+
+
+def _clean(record: dict) -> dict:
+    # Other empty CSV cells mean "no value", not an empty string or a zero ISBN
+    return {
+        key: (None if value == "" and key not in REQUIRED_TEXT_FIELDS else value)
+        for key, value in record.items()
+        if key in IMPORT_FIELDS
+    }
+
+
+def _errors(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+def parse_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[schemas.BDCreate], List[str]]]:
+    """Yield ``(row, bd, errors)`` for every record of the upload.
+
+    ``row`` counts data records from 1; ``bd`` is None when the record is
+    invalid, in which case ``errors`` says why.
+    """
+    if fmt == "csv":
+        records = csv.DictReader(lines)
+    else:
+        records = (line for line in lines if line.strip())
+
+    row = 0
+    while True:
+        row += 1
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            # The rest of the file cannot be read reliably
+            yield row, None, [f"Malformed CSV: {exc}"]
+            return
+
+        if fmt == "ndjson":
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                yield row, None, [f"Invalid JSON: {exc}"]
+                continue
+            if not isinstance(record, dict):
+                yield row, None, ["Expected a JSON object"]
+                continue
+
+        try:
+            yield row, schemas.BDCreate(**_clean(record)), []
+        except ValidationError as exc:
+            yield row, None, _errors(exc)
+
+
+def import_batch(db: Session, batch: List[Tuple[int, schemas.BDCreate]], seen_cotes: set) -> Tuple[List[dict], List[models.BD]]:
+    """Insert one batch of validated rows in its own transaction.
+
+    ``seen_cotes`` holds the cotes of the rows created so far, so that
+    duplicates inside the upload are rejected too. Returns the report
+    entries of the batch and the created BDs.
+    """
+    report = []
+    candidates = {}
+    for row, bd in batch:
+        if bd.cote in seen_cotes or bd.cote in candidates:
+            report.append({"row": row, "status": "rejected", "cote": bd.cote, "errors": ["Duplicate cote in upload"]})
+        else:
+            candidates[bd.cote] = (row, bd)
+
+    if candidates:
+        existing = {cote for (cote,) in db.query(models.BD.cote).filter(models.BD.cote.in_(candidates))}
+        for cote in existing:
+            row, _ = candidates.pop(cote)
+            report.append({"row": row, "status": "rejected", "cote": cote, "errors": ["Cote already exists"]})
+
+    created = []
+    if candidates:
+        now = datetime.utcnow()
+        values = []
+        for row, bd in candidates.values():
+            data = bd.dict()
+            # Core inserts skip the ORM validator that keeps the sort key in sync
+            data["numtome_sort"] = models.tome_sort_key(bd.numtome)
+            data["date_creation"] = now
+            values.append(data)
+        try:
+            # A Core insert keeps the batch a single executemany; the ORM bulk
+            # insert would split it on every change in which columns are NULL
+            db.execute(insert(models.BD.__table__), values)
+            stats.bds_created(db, now.date(), len(values))
+            bids = dict(
+                db.query(models.BD.cote, models.BD.bid)
+                .filter(models.BD.cote.in_(candidates))
+                .all()
+            )
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            error = f"Batch failed: {exc.__class__.__name__}"
+            for cote, (row, _) in candidates.items():
+                report.append({"row": row, "status": "rejected", "cote": cote, "errors": [error]})
+        else:
+            for data in values:
+                cote = data["cote"]
+                seen_cotes.add(cote)
+                created.append(models.BD(bid=bids[cote], **data))
+                report.append({"row": candidates[cote][0], "status": "created", "cote": cote, "bid": bids[cote]})
+
+    report.sort(key=lambda entry: entry["row"])
+    return report, created
@@ -0,0 +1,132 @@
+"""
+Streaming exports of the catalogue and of the rental history.
+
+Rows are read through a server-side cursor (``yield_per``) and written out
+one chunk at a time, so memory use does not grow with the size of the
+table. Each export opens its own session: the response body is produced
+after the request handler has returned, once the request's own session is
+already closed.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from . import models
+from .database import SessionLocal
+
+# Export formats accepted by the export endpoints, each with a MEDIA_TYPES entry
+FORMATS = ("csv", "ndjson")
+
+# Rows fetched from the server-side cursor and written out at a time
+CHUNK_ROWS = 1000
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+BD_COLUMNS = [
+    column for column in models.BD.__table__.c
+    if column.key != "numtome_sort"
+]
+
+LOCATION_COLUMNS = [
+    models.Locations.lid,
+    models.Locations.bid,
+    models.BD.cote,
+    models.BD.titreserie,
+    models.BD.titrealbum,
+    models.BD.numtome,
+    models.Locations.mid,
+    models.Membres.nom,
+    models.Membres.prenom,
+    models.Locations.date,
+    models.Locations.debut,
+    models.Locations.fin,
+    models.Locations.paye,
+    models.Locations.mail_rappel_1_envoye,
+    models.Locations.mail_rappel_2_envoye,
+]
+
+
+def bd_query():
+    return select(*BD_COLUMNS).order_by(models.BD.bid)
+
+
+def location_query(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    mid: Optional[int] = None,
+    open_only: bool = False
+):
+    """Rental history joined with its BD and member, filtered on the rental date."""
+    query = (
+        select(*LOCATION_COLUMNS)
+        .join(models.BD, models.Locations.bid == models.BD.bid)
+        .outerjoin(models.Membres, models.Locations.mid == models.Membres.mid)
+        .order_by(models.Locations.lid)
+    )
+    if start is not None:
+        query = query.where(models.Locations.date >= start)
+    if end is not None:
+        query = query.where(models.Locations.date <= end)
+    if mid is not None:
+        query = query.where(models.Locations.mid == mid)
+    if open_only:
+        query = query.where(models.Locations.fin.is_(None))
+    return query
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_chunk(fmt: str, header, rows) -> str:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(
+                {key: _json_value(value) for key, value in row._mapping.items()},
+                ensure_ascii=False
+            ))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def stream_rows(query, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Run ``query`` with a server-side cursor and yield the encoded output."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    with SessionLocal() as db:
+        result = db.execute(query.execution_options(yield_per=CHUNK_ROWS))
+        header = list(result.keys())
+        for rows in result.partitions():
+            data = _encode_chunk(fmt, header, rows).encode()
+            header = None
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if header is not None and fmt == "csv":
+            # Empty export, still send the header row
+            data = _encode_chunk(fmt, header, []).encode()
+            yield compressor.compress(data) if compressor is not None else data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def filename(name: str, fmt: str, gzip: bool) -> str:
+    suffix = ".gz" if gzip else ""
+    return f"{name}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}{suffix}"
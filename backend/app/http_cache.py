@@ -0,0 +1,110 @@
+"""
+HTTP conditional caching for the public catalogue endpoints.
+
+The catalogue only changes when an admin edits it, so its responses carry
+an ``ETag`` derived from a catalogue version, plus ``Cache-Control``. A
+client (or the reverse proxy) revalidating with ``If-None-Match`` gets a
+bodiless 304 without the listing query running.
+
+The version is a signature of the ``bd`` table: row count, highest
+``bid`` and latest ``date_modification``. Creating or importing BDs
+changes the count and the highest bid, deleting one changes the count,
+and ``update_bd`` stamps ``date_modification``, so every worker process
+derives the same version from the same data. The signature is cached for
+``CATALOGUE_VERSION_SECONDS``; the write endpoints of this process
+invalidate it right away with ``bump()``, other processes notice within
+that delay.
+
+There is no ``Last-Modified``: the data holds no modification time of the
+catalogue as a whole (a deletion leaves none behind), and a time taken by
+each process when it notices a new version differs between workers and
+cannot tell apart two edits made within the same second.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import run_db
+
+VERSION_SECONDS = float(os.getenv("CATALOGUE_VERSION_SECONDS", "5"))
+
+# How long browsers and proxies may reuse a response without revalidating
+MAX_AGE = int(os.getenv("CATALOGUE_MAX_AGE", "30"))
+
+
+class CatalogueVersion:
+    """Cached signature of the ``bd`` table, as an ETag."""
+
+    def __init__(self, ttl: float = VERSION_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._etag: Optional[str] = None
+        self._expires = 0.0
+        self._listeners = []
+
+    def on_change(self, listener):
+        """Call ``listener()`` whenever a new version is seen, e.g. one written by another process."""
+        self._listeners.append(listener)
+        return listener
+
+    def load(self, db: Session) -> str:
+        count, max_bid, max_modified = db.query(
+            func.count(models.BD.bid),
+            func.max(models.BD.bid),
+            func.max(models.BD.date_modification)
+        ).one()
+        signature = f"{count}:{max_bid}:{max_modified}"
+        etag = 'W/"' + hashlib.sha1(signature.encode()).hexdigest()[:16] + '"'
+        with self._lock:
+            changed = self._etag is not None and etag != self._etag
+            self._etag = etag
+            self._expires = time.monotonic() + self.ttl
+        if changed:
+            for listener in self._listeners:
+                listener()
+        return etag
+
+    async def current(self) -> str:
+        """Return the ETag of the catalogue."""
+        with self._lock:
+            if self._etag is not None and time.monotonic() < self._expires:
+                return self._etag
+        return await run_db(self.load)
+
+    def bump(self):
+        """Forget the cached version after a catalogue write."""
+        with self._lock:
+            self._expires = 0.0
+
+
+catalogue_version = CatalogueVersion()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as for GET requests
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set the caching headers, returning a 304 if the client's copy is current."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
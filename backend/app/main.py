@@ -1,11 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from .routes import router as api_router
-from .database import engine
-from . import models
+from .database import get_engine, pool_metrics, run_db, warm_async_pool, warm_pool
+from .availability import availability_index, reconcile_forever
+from .auth import shutdown_password_pool
+from . import metrics
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# The schema is created and migrated by init_db.py, not when the app starts,
+# so that importing the app never touches the database
+
+# Delay between two warm-up attempts while the database is unreachable
+WARMUP_RETRY_SECONDS = 2
 
 app = FastAPI(
     title="BD Library API",
@@ -23,8 +31,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Added last so it wraps everything, CORS included
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(api_router)
 
 @app.get("/")
@@ -32,12 +44,61 @@ def read_root():
     return {"message": "BD Library API is running! Visit /docs for API documentation."}
 
 
-# After defining all your routes, add this:
+@app.get("/ready")
+def readiness(request: Request, response: Response):
+    """Readiness probe: 503 until the connection pool and the availability index are warm.
+
+    The pool and index details are only included for callers with the metrics token.
+    """
+    ready = getattr(app.state, "ready", False)
+    if not ready:
+        response.status_code = 503
+    if not metrics.authorized(request.headers.get("authorization")):
+        return {"ready": ready}
+    return {
+        "ready": ready,
+        "availability_loaded": availability_index.stats()["loaded"],
+        "pool": pool_metrics(get_engine()),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(request: Request):
+    """Per-route latency, SQL statement, database time and response size histograms (metrics token only)."""
+    if metrics.METRICS_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not metrics.authorized(request.headers.get("authorization")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def warm_up():
+    while True:
+        try:
+            await run_in_threadpool(warm_pool)
+            await warm_async_pool()
+            await run_db(availability_index.load)
+        except Exception as e:
+            print(f"Warm-up failed, retrying in {WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            continue
+        app.state.ready = True
+        return
+
+
 @app.on_event("startup")
-async def startup_event():
-    print("Available routes:")
-    for route in app.routes:
-        if hasattr(route, 'methods'):
-            print(f"{route.methods} {route.path}")
-        else:
-            print(f"WebSocket {route.path}")
\ No newline at end of file
+async def start_background_tasks():
+    # Start serving right away, the pool and the availability index warm up
+    # in the background and /ready reports when they are done
+    app.state.ready = False
+    app.state.warm_up = asyncio.create_task(warm_up())
+    app.state.availability_reconciler = asyncio.create_task(reconcile_forever())
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    shutdown_password_pool()
@@ -0,0 +1,238 @@
+"""
+Request-level performance metrics.
+
+``MetricsMiddleware`` times every HTTP request and records, per route
+template (``/admin/membres/{member_id}/rentals``, not the concrete path):
+
+- the request latency,
+- the number of SQL statements it executed,
+- the time spent in the database,
+- the size of the response body.
+
+The SQL figures come from ``before_cursor_execute``/``after_cursor_execute``
+listeners that ``instrument_engine`` installs on the application's engines.
+They add to the statistics of the request being served, found through a
+context variable, which the threadpool running sync handlers inherits.
+Statements run outside a request (warm-up, the availability reconciler)
+are not counted.
+
+Every figure is a Prometheus histogram, served in the Prometheus text format
+by ``/metrics``. Each response also carries a ``Server-Timing`` header with
+its database time, statement count and total time, which the browser's
+developer tools display next to the request. The statement count catches
+N+1 regressions at a glance: a list endpoint whose count grows with the page
+size issues one query per row.
+
+Streaming responses do most of their database work after the headers are
+sent, so their ``Server-Timing`` only covers the time before the first byte;
+the histograms cover the whole request.
+
+The method label is one of the standard HTTP methods or "other", so
+requests with made-up methods cannot create new series either.
+
+``/metrics`` and the details of ``/ready`` are only served to callers
+presenting ``METRICS_TOKEN`` as a bearer token; without it set, ``/metrics``
+is disabled and ``/ready`` only answers whether the worker is ready.
+"""
+
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Bucket upper bounds of each histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Label of the requests that matched no route, so unknown paths cannot
+# create new series
+UNMATCHED_ROUTE = "unmatched"
+
+# Methods labelled as themselves, every other one is labelled OTHER_METHOD
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+OTHER_METHOD = "other"
+
+# Bearer token required by /metrics and by the details of /ready
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_engine(engine):
+    """Count the statements and the database time of the requests served by ``engine``.
+
+    Takes a sync engine, or the ``sync_engine`` of an async one.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label set."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        # labels -> ([count per bucket, +Inf last], sum)
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {_number(total)}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+LABELS = ("method", "route", "status")
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve a request.", LATENCY_BUCKETS, LABELS
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_sql_statements", "SQL statements executed by a request.", STATEMENT_BUCKETS, LABELS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time a request spent executing SQL statements.", LATENCY_BUCKETS, LABELS
+)
+RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes", "Size of the response body.", SIZE_BUCKETS, LABELS
+)
+
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_STATEMENTS, REQUEST_DB_SECONDS, RESPONSE_BYTES)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    return "".join(histogram.render() for histogram in HISTOGRAMS)
+
+
+def authorized(authorization: Optional[str]) -> bool:
+    """Whether an ``Authorization`` header carries ``METRICS_TOKEN``; always False when it is unset."""
+    if METRICS_TOKEN is None or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(token.strip().encode(), METRICS_TOKEN.encode())
+
+
+def server_timing(stats: RequestStats, elapsed: float) -> str:
+    plural = "" if stats.statements == 1 else "s"
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} SQL statement{plural}", '
+        f"total;dur={elapsed * 1000:.1f}"
+    )
+
+
+class MetricsMiddleware:
+    """Record the metrics of every HTTP request and add its Server-Timing header.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware``, so that the
+    response body is passed through untouched and only measured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            method = scope["method"] if scope["method"] in KNOWN_METHODS else OTHER_METHOD
+            labels = (method, getattr(route, "path", UNMATCHED_ROUTE), str(status))
+            REQUEST_SECONDS.observe(labels, time.perf_counter() - started)
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            REQUEST_DB_SECONDS.observe(labels, stats.db_seconds)
+            RESPONSE_BYTES.observe(labels, size)
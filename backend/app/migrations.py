@@ -0,0 +1,177 @@
+"""
+Schema migrations for existing databases.
+
+``Base.metadata.create_all`` only creates missing tables: it never adds a
+column or an index to a table that already exists. Each migration below
+brings an existing database up to date with the models. Applied migrations
+are recorded in the ``schema_migrations`` table so that they only run once,
+and every migration must also be harmless on a database that ``create_all``
+has just created.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, String, Table, TIMESTAMP, bindparam, func, inspect, select, text
+
+from . import models, stats
+
+MIGRATIONS = []
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", TIMESTAMP),
+)
+
+
+def migration(version: str):
+    """Register a migration; migrations run in version order."""
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return register
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _index_names(conn, table: str) -> set:
+    # Expression-based indexes are not reflected by the inspector, so list
+    # index names from the catalog instead
+    if conn.dialect.name == "mysql":
+        rows = conn.execute(text(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = :table"
+        ), {"table": table})
+    elif conn.dialect.name == "sqlite":
+        rows = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+        ), {"table": table})
+    else:
+        return {index["name"] for index in inspect(conn).get_indexes(table)}
+    return {row[0] for row in rows}
+
+
+def _create_indexes(conn, table: Table, *names: str):
+    """Create the named indexes of ``table`` that do not exist yet.
+
+    Each migration names the indexes it introduces: the models always hold
+    the latest indexes, which may cover columns that later migrations add.
+    """
+    indexes = {index.name: index for index in table.indexes}
+    existing = _index_names(conn, table.name)
+    for name in names:
+        if name not in existing:
+            indexes[name].create(conn)
+
+
+@migration("0001_bd_numtome_sort")
+def add_bd_numtome_sort(conn):
+    """Add the persisted numeric tome key and the catalogue sort indexes."""
+    bd = models.BD.__table__
+    if not _has_column(conn, "bd", "numtome_sort"):
+        conn.execute(text(
+            f"ALTER TABLE bd ADD COLUMN numtome_sort INTEGER NOT NULL DEFAULT {models.MISSING_TOME}"
+        ))
+
+    # Backfill with the same parsing the ORM applies on writes
+    rows = conn.execute(select(bd.c.bid, bd.c.numtome, bd.c.numtome_sort)).all()
+    updates = [
+        {"b_bid": bid, "b_numtome_sort": models.tome_sort_key(numtome)}
+        for bid, numtome, numtome_sort in rows
+        if numtome_sort != models.tome_sort_key(numtome)
+    ]
+    if updates:
+        conn.execute(
+            bd.update()
+            .where(bd.c.bid == bindparam("b_bid"))
+            .values(numtome_sort=bindparam("b_numtome_sort")),
+            updates
+        )
+
+    sort_fields = ("cote", "titrealbum", "scenariste", "dessinateur", "collection", "editeur", "genre")
+    _create_indexes(
+        conn, bd, "ix_bd_default_order", "ix_bd_numtome_sort",
+        *(f"ix_bd_sort_{field}" for field in sort_fields)
+    )
+
+
+@migration("0002_stats_tables")
+def add_stats_tables(conn):
+    """Create the statistics tables and backfill them from the existing data."""
+    models.StatCounter.__table__.create(conn, checkfirst=True)
+    models.StatRollup.__table__.create(conn, checkfirst=True)
+    stats.rebuild(conn)
+
+
+@migration("0003_locations_fin_date_index")
+def add_locations_fin_date_index(conn):
+    """Index the open rentals by date, for the overdue reminders."""
+    _create_indexes(conn, models.Locations.__table__, "ix_locations_fin_date")
+
+
+@migration("0004_locations_open_bid")
+def add_locations_open_bid(conn):
+    """Allow only one open rental per BD, with a unique generated column."""
+    locations = models.Locations.__table__
+    # Close the older open rentals of a BD that was rented out again, as of
+    # the start of its latest rental
+    duplicates = conn.execute(
+        select(locations.c.bid)
+        .where(locations.c.fin.is_(None))
+        .group_by(locations.c.bid)
+        .having(func.count() > 1)
+    ).scalars().all()
+    for bid in duplicates:
+        latest_lid, latest_debut = conn.execute(
+            select(locations.c.lid, locations.c.debut)
+            .where(locations.c.bid == bid, locations.c.fin.is_(None))
+            .order_by(locations.c.lid.desc())
+            .limit(1)
+        ).one()
+        conn.execute(
+            locations.update()
+            .where(locations.c.bid == bid, locations.c.fin.is_(None), locations.c.lid != latest_lid)
+            .values(fin=latest_debut)
+        )
+    if duplicates:
+        print(f"Closed the older open rentals of {len(duplicates)} BDs rented out twice")
+
+    if not _has_column(conn, "locations", "open_bid"):
+        conn.execute(text(
+            "ALTER TABLE locations ADD COLUMN open_bid INTEGER "
+            "GENERATED ALWAYS AS (CASE WHEN fin IS NULL THEN bid END) VIRTUAL"
+        ))
+    _create_indexes(conn, locations, "ux_locations_open_bid")
+
+
+@migration("0005_member_rental_history")
+def add_member_rental_history(conn):
+    """Index the rentals of a member newest first and keep each member's rental total."""
+    if not _has_column(conn, "membres", "nb_locations"):
+        conn.execute(text("ALTER TABLE membres ADD COLUMN nb_locations INTEGER NOT NULL DEFAULT 0"))
+    stats.recount_member_rentals(conn)
+    _create_indexes(conn, models.Locations.__table__, "ix_locations_mid_debut")
+
+
+@migration("0006_locations_open_rental_indexes")
+def add_locations_open_rental_indexes(conn):
+    """Index the open rentals of a BD and of a member."""
+    _create_indexes(conn, models.Locations.__table__, "ix_locations_bid_fin", "ix_locations_mid_fin")
+
+
+def run_migrations(engine):
+    """Apply all pending migrations, each in its own transaction."""
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+        print(f"✓ Applied migration {version}")
@@ -1,7 +1,40 @@
-from sqlalchemy import Column, String, Integer, Date, TIMESTAMP, Text, ForeignKey, Boolean, UniqueConstraint
-from sqlalchemy.orm import relationship
+import re
+from sqlalchemy import Column, Computed, String, Integer, Date, TIMESTAMP, Text, ForeignKey, Boolean, UniqueConstraint, Index, func, literal_column
+from sqlalchemy.orm import relationship, validates
 from .database import Base
 
+# numtome_sort value for BDs without a tome number, sorted before every tome
+MISSING_TOME = -2147483648
+
+def tome_sort_key(numtome):
+    """Integer sort key of a tome number, parsed like MySQL's CAST(numtome AS SIGNED)."""
+    if numtome is None:
+        return MISSING_TOME
+    match = re.match(r"\s*([+-]?\d+)", numtome)
+    if not match:
+        return 0
+    return max(min(int(match.group(1)), 2147483647), MISSING_TOME + 1)
+
+def sort_key_expressions(column):
+    """Expressions ordering a column with nulls, then empty strings, after the values.
+
+    That is in ascending order; sorted descending on all the expressions,
+    as the catalogue does, nulls and empty strings come first.
+
+    Shared by the catalogue queries and the indexes on ``bd``, since MySQL only
+    uses a functional index when the query repeats its expressions exactly.
+    """
+    column_def = column.expression
+    # The empty string is rendered inline rather than bound: SQLite never
+    # matches an indexed expression against one holding a parameter
+    empty = literal_column("''")
+    expressions = []
+    if column_def.nullable:
+        expressions.append(column.is_(None))
+        column = func.coalesce(column, empty)
+    expressions += [column == empty, column]
+    return expressions
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -31,8 +64,20 @@ class BD(Base):
     titre_norm = Column(String(255))
     serie_norm = Column(String(255))
     ISBN = Column(Integer)
+    numtome_sort = Column(Integer, nullable=False, default=MISSING_TOME)
     locations = relationship("Locations", back_populates="bd")
 
+    @validates("numtome")
+    def _sync_numtome_sort(self, key, numtome):
+        self.numtome_sort = tome_sort_key(numtome)
+        return numtome
+
+# Indexes matching the catalogue sort orders, so pages are read in index order
+Index("ix_bd_default_order", *sort_key_expressions(BD.titreserie), BD.numtome_sort, BD.bid)
+Index("ix_bd_numtome_sort", BD.numtome_sort, BD.bid)
+for _field in ("cote", "titrealbum", "scenariste", "dessinateur", "collection", "editeur", "genre"):
+    Index(f"ix_bd_sort_{_field}", *sort_key_expressions(getattr(BD, _field)), BD.bid)
+
 class Membres(Base):
     __tablename__ = "membres"
     mid = Column(Integer, primary_key=True, autoincrement=True)
@@ -52,6 +97,9 @@ class Membres(Base):
     vip = Column(Boolean, default=False, nullable=False)
     IBAN = Column(String(50))
     groupe = Column(String(255))
+    # Number of rentals of the member, kept up to date by the rent endpoints
+    # (app/stats.py) so the rental history needs no COUNT(*)
+    nb_locations = Column(Integer, nullable=False, default=0)
     locations = relationship("Locations", back_populates="membre")
     UniqueConstraint("nom", "prenom", name="unique_nom_prenom")
 
@@ -66,6 +114,32 @@ class Locations(Base):
     mail_rappel_2_envoye = Column(Boolean, default=False, nullable=False)
     debut = Column(TIMESTAMP, default="CURRENT_TIMESTAMP", nullable=False)
     fin = Column(TIMESTAMP)
+    # The BD of an open rental, NULL once returned; unique, so that a BD can
+    # only have one open rental even under concurrent checkouts
+    open_bid = Column(Integer, Computed("CASE WHEN fin IS NULL THEN bid END", persisted=False))
     bd = relationship("BD", back_populates="locations")
     membre = relationship("Membres", back_populates="locations")
-    
\ No newline at end of file
+
+# Open rentals by date, for the overdue reminders (app/reminders.py); also
+# serves every plain "fin IS NULL" filter, so fin needs no index of its own
+Index("ix_locations_fin_date", Locations.fin, Locations.date)
+# The open rental of a BD (availability checks, rents) and of a member
+Index("ix_locations_bid_fin", Locations.bid, Locations.fin)
+Index("ix_locations_mid_fin", Locations.mid, Locations.fin)
+Index("ux_locations_open_bid", Locations.open_bid, unique=True)
+# A member's rental history, newest first (the history endpoint's keyset order)
+Index("ix_locations_mid_debut", Locations.mid, Locations.debut.desc(), Locations.lid)
+    
+class StatCounter(Base):
+    """Running totals kept up to date by the write endpoints, see app/stats.py."""
+    __tablename__ = "stats_counters"
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class StatRollup(Base):
+    """Daily totals per metric, optionally broken down by a dimension (e.g. a series)."""
+    __tablename__ = "stats_rollup"
+    metric = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    dimension = Column(String(255), primary_key=True, default='')
+    value = Column(Integer, nullable=False, default=0)
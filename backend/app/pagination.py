@@ -0,0 +1,78 @@
+"""
+Keyset (cursor) pagination helpers.
+
+An OFFSET query has to sort and throw away every row before the requested
+page, so deep pages get slower and slower. With keyset pagination the client
+sends back an opaque cursor holding the sort key of the last row it received,
+and the next page is selected with a "comes after this key" predicate instead.
+
+A sort key is a list of ``(expression, descending)`` pairs whose last entry
+must be unique (the primary key), so that every row has a distinct position.
+Expressions must never evaluate to NULL, since NULL does not compare.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+SortKey = Sequence[Tuple[Any, bool]]
+
+
+def apply_sort(query, keys: SortKey):
+    """Order a query by the given sort key."""
+    return query.order_by(*[expr.desc() if descending else expr.asc() for expr, descending in keys])
+
+
+def keyset_filter(keys: SortKey, values: Sequence[Any]):
+    """Build the predicate selecting rows that sort strictly after ``values``."""
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        equal_prefix = [key == value for (key, _), value in zip(keys[:i], values[:i])]
+        after = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+
+def _encode_value(value):
+    # Booleans only compare with '=' in SQLAlchemy, integers compare the same way
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last row into an opaque cursor."""
+    payload = {"s": sort, "k": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, length: int) -> List[Any]:
+    """Decode a cursor, checking that it was issued for the same sort order."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(value) for value in payload["k"]]
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if payload.get("s") != sort or len(values) != length:
+        raise ValueError("Cursor does not match the requested sort order")
+    return values
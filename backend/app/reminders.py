@@ -0,0 +1,293 @@
+"""
+Overdue rental reminders.
+
+A rental gets a first reminder once it has been open for
+``REMINDER_1_DAYS`` and a second one after ``REMINDER_2_DAYS``; the
+``mail_rappel_1_envoye`` and ``mail_rappel_2_envoye`` flags record which
+were sent. A rental that is already past the second delay without having
+had the first reminder gets the second one right away, with both flags
+set, so a rerun never sends two reminders for the same rental on one day.
+
+The open rentals due a reminder are read with one query on the
+``(fin, date)`` index, ordered by member and fetched in keyset pages of
+``CHUNK_ROWS``, so the job never holds more than a page in memory. Each
+member gets a single mail listing all their overdue BDs. After each page,
+the flags of the rentals that were mailed are set with one bulk UPDATE per
+reminder level and committed. Rerunning the job only picks up what is
+still due: a member whose mail failed is retried, the others are not
+mailed again.
+
+Mails go through a pluggable backend: ``SMTPBackend`` for a real server
+(or a local stand-in such as ``python -m aiosmtpd -n``) and ``FileBackend``,
+which writes ``.eml`` files to a directory for development and tests.
+"""
+
+import os
+import smtplib
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .pagination import keyset_filter
+
+REMINDER_1_DAYS = int(os.getenv("REMINDER_1_DAYS", "14"))
+REMINDER_2_DAYS = int(os.getenv("REMINDER_2_DAYS", "28"))
+
+# Rentals read, mailed and flagged at a time
+CHUNK_ROWS = 500
+
+MAIL_FROM = os.getenv("MAIL_FROM", "kotbd@kapucl.be")
+
+Locations = models.Locations
+
+REMINDER_COLUMNS = [
+    Locations.lid,
+    Locations.mid,
+    Locations.date,
+    models.Membres.nom,
+    models.Membres.prenom,
+    models.Membres.mail,
+    models.BD.cote,
+    models.BD.titreserie,
+    models.BD.numtome,
+    models.BD.titrealbum,
+]
+
+# Keyset order of the job, every member's rentals come together
+SORT_KEY = [(Locations.mid, False), (Locations.lid, False)]
+
+
+class MailBackend:
+    """Sends the reminders of one run; used as a context manager around the run."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, message: EmailMessage):
+        raise NotImplementedError
+
+
+class SMTPBackend(MailBackend):
+    """Sends through an SMTP server, over a single connection per run."""
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        username: str = None,
+        password: str = None,
+        starttls: bool = None,
+        timeout: float = 30
+    ):
+        self.host = host or os.getenv("SMTP_HOST", "localhost")
+        self.port = port or int(os.getenv("SMTP_PORT", "25"))
+        self.username = username if username is not None else os.getenv("SMTP_USER")
+        self.password = password if password is not None else os.getenv("SMTP_PASSWORD")
+        if starttls is None:
+            starttls = os.getenv("SMTP_STARTTLS", "false").lower() in ("1", "true", "yes")
+        self.starttls = starttls
+        self.timeout = timeout
+        self.smtp = None
+
+    def __enter__(self):
+        self.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            self.smtp.starttls()
+        if self.username:
+            self.smtp.login(self.username, self.password or "")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.smtp.quit()
+        except smtplib.SMTPException:
+            self.smtp.close()
+        self.smtp = None
+        return False
+
+    def send(self, message: EmailMessage):
+        self.smtp.send_message(message)
+
+
+class FileBackend(MailBackend):
+    """Writes every mail to ``directory`` as an ``.eml`` file instead of sending it."""
+
+    def __init__(self, directory: str = None):
+        self.directory = Path(directory or os.getenv("MAIL_FILE_DIR", "sent_mail"))
+        self.sent = 0
+
+    def __enter__(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def send(self, message: EmailMessage):
+        self.sent += 1
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.sent:05d}.eml"
+        (self.directory / name).write_bytes(bytes(message))
+
+
+BACKENDS = {
+    "smtp": SMTPBackend,
+    "file": FileBackend,
+}
+
+
+def get_backend(name: str = None) -> MailBackend:
+    """Return the backend selected by ``name`` or MAIL_BACKEND (default: smtp)."""
+    name = name or os.getenv("MAIL_BACKEND", "smtp")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown mail backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+@dataclass
+class Overdue:
+    """The overdue rentals of one member, and the reminder level each one is due."""
+
+    mid: int
+    nom: str
+    prenom: str
+    mail: Optional[str]
+    rentals: List[tuple] = field(default_factory=list)
+    levels: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def level(self) -> int:
+        return max(self.levels.values())
+
+
+def overdue_query(today: date):
+    """Open rentals due a first or a second reminder on ``today``."""
+    first_cutoff = today - timedelta(days=REMINDER_1_DAYS)
+    second_cutoff = today - timedelta(days=REMINDER_2_DAYS)
+    return (
+        select(*REMINDER_COLUMNS)
+        .join(models.Membres, Locations.mid == models.Membres.mid)
+        .join(models.BD, Locations.bid == models.BD.bid)
+        .where(
+            Locations.fin.is_(None),
+            Locations.date < first_cutoff,
+            or_(
+                and_(Locations.date >= second_cutoff, Locations.mail_rappel_1_envoye.is_(False)),
+                and_(Locations.date < second_cutoff, Locations.mail_rappel_2_envoye.is_(False))
+            )
+        )
+    )
+
+
+def iter_overdue(db: Session, today: date, chunk_rows: int = CHUNK_ROWS):
+    """Yield pages of complete ``Overdue`` members, in member order.
+
+    Pages are read with a keyset cursor on ``(mid, lid)``. The last member
+    of a page may have more rentals on the next one, so it is held back and
+    completed first.
+    """
+    second_cutoff = today - timedelta(days=REMINDER_2_DAYS)
+    query = overdue_query(today).order_by(*[expr for expr, _ in SORT_KEY]).limit(chunk_rows)
+    after = None
+    pending: Optional[Overdue] = None
+    while True:
+        page = query if after is None else query.where(keyset_filter(SORT_KEY, after))
+        rows = db.execute(page).all()
+        members = []
+        for row in rows:
+            if pending is None or pending.mid != row.mid:
+                if pending is not None:
+                    members.append(pending)
+                pending = Overdue(row.mid, row.nom, row.prenom, row.mail)
+            pending.rentals.append(row)
+            pending.levels[row.lid] = 2 if row.date < second_cutoff else 1
+        if len(rows) < chunk_rows:
+            if pending is not None:
+                members.append(pending)
+            if members:
+                yield members
+            return
+        after = (rows[-1].mid, rows[-1].lid)
+        if members:
+            yield members
+
+
+def _album(row) -> str:
+    title = " ".join(part.strip() for part in (row.titreserie, row.numtome) if part and part.strip())
+    if row.titrealbum and row.titrealbum.strip():
+        title = f"{title} - {row.titrealbum.strip()}" if title else row.titrealbum.strip()
+    return f"{title} ({row.cote})"
+
+
+def build_message(member: Overdue, sender: str = MAIL_FROM) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = member.mail
+    if member.level == 2:
+        message["Subject"] = "Kot BD : second rappel, BD à rapporter"
+    else:
+        message["Subject"] = "Kot BD : rappel, BD à rapporter"
+    albums = "\n".join(
+        f"- {_album(row)}, empruntée le {row.date:%d/%m/%Y}"
+        for row in member.rentals
+    )
+    message.set_content(
+        f"Bonjour {member.prenom},\n\n"
+        f"Les BD suivantes sont à rapporter au Kot BD :\n\n"
+        f"{albums}\n\n"
+        f"Merci de les ramener au plus vite.\n\n"
+        f"L'équipe du Kot BD\n"
+    )
+    return message
+
+
+def _flag(db: Session, lids: List[int], level: int):
+    values = {"mail_rappel_1_envoye": True}
+    if level == 2:
+        values["mail_rappel_2_envoye"] = True
+    db.execute(update(models.Locations.__table__).where(models.Locations.lid.in_(lids)).values(**values))
+
+
+def send_reminders(
+    db: Session,
+    backend: MailBackend,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+    chunk_rows: int = CHUNK_ROWS
+) -> dict:
+    """Mail every member with overdue rentals once and flag the reminded rentals."""
+    today = today or date.today()
+    report = {"members": 0, "mails_sent": 0, "rentals_flagged": 0, "no_address": 0, "failed": 0, "errors": []}
+    # A dry run neither connects to the mail server nor writes anything
+    with nullcontext() if dry_run else backend:
+        for members in iter_overdue(db, today, chunk_rows):
+            flagged: Dict[int, List[int]] = {1: [], 2: []}
+            for member in members:
+                report["members"] += 1
+                if not member.mail:
+                    report["no_address"] += 1
+                    continue
+                if dry_run:
+                    print(f"Would remind {member.prenom} {member.nom} <{member.mail}> of {len(member.rentals)} BD(s)")
+                    continue
+                try:
+                    backend.send(build_message(member))
+                except (smtplib.SMTPException, OSError) as e:
+                    report["failed"] += 1
+                    report["errors"].append(f"mid {member.mid}: {e}")
+                    continue
+                report["mails_sent"] += 1
+                for lid, level in member.levels.items():
+                    flagged[level].append(lid)
+            for level, lids in flagged.items():
+                for start in range(0, len(lids), chunk_rows):
+                    _flag(db, lids[start:start + chunk_rows], level)
+                report["rentals_flagged"] += len(lids)
+            db.commit()
+    return report
@@ -0,0 +1,39 @@
+"""
+Fast JSON responses for list endpoints.
+
+List handlers build plain dicts from column-projected rows and return a
+``FastJSONResponse`` directly, skipping ``response_model`` validation and
+``jsonable_encoder``, which walk every value of every row. The body is
+encoded with orjson when it is installed and with the standard library
+otherwise; both produce the same JSON as FastAPI's default response for
+the types these endpoints return (str, int, bool, None, date, datetime).
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
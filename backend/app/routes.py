@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, cast, Integer
-from typing import Optional
-from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import Date, Select, TIMESTAMP, false, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Union
+from datetime import date, datetime, timedelta
+import anyio.from_thread
+import codecs
+import os
 import re
-from . import models, schemas
-from .database import SessionLocal
-from .auth import verify_password, get_password_hash, create_access_token, verify_token
+from . import bd_import, exports, stats
+from . import database, models, schemas
+from .database import SessionLocal, run_db, run_db_in_threadpool
+from .search import SEARCH_FIELDS, normalize, search_index
+from .availability import availability_index
+from .http_cache import catalogue_version, conditional_response
+from .responses import FastJSONResponse, dumps
+from .cache import ResponseCache, TTLCache
+from .pagination import apply_sort, decode_cursor, encode_cursor, keyset_filter
+from .auth import (
+    PasswordPoolBusy, create_access_token, hash_password, login_ip_throttle, login_user_throttle,
+    token_cache, user_cache, verify_password_async, verify_token
+)
 
 router = APIRouter()
 security = HTTPBearer()
@@ -31,36 +47,253 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(models.User).filter(models.User.username == token_data["username"]).first()
+    user = user_cache.get(token_data["username"])
     if user is None:
+        user = db.query(models.User).filter(models.User.username == token_data["username"]).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # Detach the fully loaded user so it can be shared between requests
+        db.expunge(user)
+        user_cache.set(user.username, user)
+    
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Inactive user",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
     return user
 
-def authenticate_user(db: Session, username: str, password: str):
+def _fetch_user(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+async def authenticate_user(username: str, password: str):
     """Authenticate user with username and password."""
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
+    user = await run_db(_fetch_user, username)
+    if not user or not user.is_active:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
+# Short-lived totals for list views, keyed by table and normalized search
+count_cache = TTLCache(maxsize=512, ttl=float(os.getenv("COUNT_CACHE_SECONDS", "30")))
+
+# Serialized public catalogue responses as (body, next cursor), bumped by
+# every catalogue or rental write of this process
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_SECONDS", "60")),
+    sizeof=lambda entry: len(entry[0]) + len(entry[1] or "")
+)
+
+# Catalogue listing helpers
+BD_SORT_FIELDS = frozenset(models.BD.__table__.c.keys())
+
+# Largest search result sent back to the database as a list of bids; a
+# broader search is filtered with ILIKE in the query instead
+SEARCH_IN_LIMIT = int(os.getenv("SEARCH_IN_LIMIT", "500"))
+
+# Columns of a catalogue row, in the order of the public BD schema
+BD_LIST_FIELDS = tuple(schemas.BDBase.model_fields)
+BD_LIST_COLUMNS = [getattr(models.BD, field) for field in BD_LIST_FIELDS]
+
+def _bd_column_keys(field: str, descending: bool):
+    """Sort key for a BD column, with nulls and empty strings after the values.
+
+    Every part of the key follows the sort direction, so that the ix_bd_sort_*
+    indexes can be read backwards: ascending sorts list nulls and empty
+    strings last, descending ones list them first.
+    """
+    column = getattr(models.BD, field)
+    table_column = models.BD.__table__.c[field]
+    if table_column.type.python_type is str:
+        # Same expressions as the ix_bd_sort_* indexes
+        return [(expr, descending) for expr in models.sort_key_expressions(column)]
+    keys = []
+    if table_column.nullable:
+        keys.append((column.is_(None), descending))
+        sentinel = 0 if table_column.type.python_type is int else datetime(1970, 1, 1)
+        column = func.coalesce(column, sentinel)
+    keys.append((column, descending))
+    return keys
+
+def _bd_tome_keys(descending: bool):
+    """Sort key for numtome as an integer, missing tomes being the smallest."""
+    return [(models.BD.numtome_sort, descending)]
+
+def _bd_sort_keys(sort_field: Optional[str], sort_order: Optional[str]):
+    """Build the catalogue sort key, ending with bid so every row has a distinct position."""
+    descending = sort_order == "desc"
+    if sort_field == 'numtome':
+        keys = _bd_tome_keys(descending)
+    elif sort_field in BD_SORT_FIELDS:
+        keys = _bd_column_keys(sort_field, descending)
+    else:
+        # Default sorting
+        descending = False
+        keys = _bd_column_keys('titreserie', False) + _bd_tome_keys(False)
+    # bid follows the sort direction, so the index can be read backwards
+    return keys + [(models.BD.bid, descending)]
+
+def _list_bd_page(db: Session, response: Response, bids, skip, limit, cursor, sort_field, sort_order, exclude_bids=None):
+    """Fetch one catalogue page, by keyset cursor if one is given or by offset otherwise.
+
+    ``bids`` restricts the page to the results of a search, a list of bids
+    or a SELECT of them (see ``_search_bds``), None means the whole
+    catalogue. ``exclude_bids`` leaves the given BDs out.
+
+    Rows are returned as plain dicts of the BD_LIST_FIELDS columns. When the
+    page is full, the cursor for the next page is returned in the
+    X-Next-Cursor response header.
+    """
+    keys = _bd_sort_keys(sort_field, sort_order)
+    if sort_field not in BD_SORT_FIELDS:
+        sort_field = None
+    sort = f"{sort_field}:{'desc' if sort_order == 'desc' else 'asc'}"
+
+    query = db.query(*BD_LIST_COLUMNS, *[expr for expr, _ in keys])
+
+    # Apply search filter if provided
+    if bids is not None:
+        query = query.filter(models.BD.bid.in_(bids))
+    if exclude_bids:
+        query = query.filter(models.BD.bid.not_in(exclude_bids))
+
+    query = apply_sort(query, keys)
+    if cursor:
+        try:
+            values = decode_cursor(cursor, sort, len(keys))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        query = query.filter(keyset_filter(keys, values))
+    else:
+        query = query.offset(skip)
+
+    rows = query.limit(limit).all()
+    width = len(BD_LIST_COLUMNS)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(sort, rows[-1][width:])
+    return [dict(zip(BD_LIST_FIELDS, row[:width])) for row in rows]
+
+def _search_bds(db: Session, search: Optional[str]):
+    """Resolve a catalogue search to its matching bids, None without a search.
+
+    Terms too short for the search index, and common terms matching more
+    than SEARCH_IN_LIMIT BDs, would send thousands of bids back to the
+    database as one IN list. They resolve to a SELECT of the matching bids
+    instead, with the ILIKE filter, which the page and the count use as a
+    subquery.
+    """
+    if not search:
+        return None
+    bids = search_index.search(db, search)
+    if bids is None or len(bids) > SEARCH_IN_LIMIT:
+        search_term = f"%{search}%"
+        return select(models.BD.bid).where(
+            or_(*[getattr(models.BD, field).ilike(search_term) for field in SEARCH_FIELDS])
+        )
+    return bids
+
+def _open_rental_bids(db: Session) -> set:
+    """Bids with an open rental in the database (a few dozen, read on ix_locations_fin_date)."""
+    return {bid for (bid,) in db.query(models.Locations.bid).filter(models.Locations.fin.is_(None))}
+
+def _available_bds(db: Session, bids, rented=None):
+    """Leave rented BDs out of a search, returns the new ``(bids, exclude_bids)``.
+
+    A search result is filtered in memory; the whole catalogue is filtered
+    in the query instead, by excluding the rented bids. ``rented`` defaults
+    to the availability index, which may lag other workers by up to a
+    reconcile interval.
+    """
+    if rented is None:
+        rented = availability_index.rented_bids(db)
+    if bids is not None and not isinstance(bids, Select):
+        return [bid for bid in bids if bid not in rented], None
+    return bids, rented
+
+@catalogue_version.on_change
+def _forget_catalogue_count():
+    # The catalogue changed, possibly through another worker
+    count_cache.pop(("bd", None))
+
+def _count_bds(db: Session, bids, exclude_bids=None) -> int:
+    """Count a catalogue search, or the whole catalogue through the count cache."""
+    if isinstance(bids, Select):
+        query = db.query(func.count(models.BD.bid)).filter(models.BD.bid.in_(bids))
+        if exclude_bids:
+            query = query.filter(models.BD.bid.not_in(exclude_bids))
+        return query.scalar()
+    if bids is not None:
+        return len(bids)
+    total = count_cache.get(("bd", None))
+    if total is None:
+        total = db.query(models.BD).count()
+        count_cache.set(("bd", None), total)
+    if exclude_bids:
+        total -= len(exclude_bids)
+    return total
+
+def _filter_members(query, search: Optional[str]):
+    """Apply the member name search filter if provided."""
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(
+            or_(
+                models.Membres.nom.ilike(search_term),
+                models.Membres.prenom.ilike(search_term),
+                models.Membres.groupe.ilike(search_term)
+            )
+        )
+    return query
+
+def _count_members(db: Session, search: Optional[str]) -> int:
+    """Count the members matching a search through the count cache."""
+    # ILIKE is case-insensitive, so searches differing only by case share a count
+    key = ("membres", search.casefold() if search else None)
+    total = count_cache.get(key)
+    if total is None:
+        total = _filter_members(db.query(models.Membres), search).count()
+        count_cache.set(key, total)
+    return total
+
 # Authentication routes
+def _too_many_requests(detail: str, retry_after: int):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
 @router.post("/auth/login", response_model=schemas.Token)
-def login(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_login.username, user_login.password)
+async def login(user_login: schemas.UserLogin, request: Request):
+    client_ip = request.client.host if request.client else "unknown"
+    # Usernames compare case-insensitively in MySQL
+    username = user_login.username.casefold()
+    retry_after = login_ip_throttle.retry_after(client_ip) or login_user_throttle.retry_after(username)
+    if retry_after:
+        raise _too_many_requests("Too many login attempts, try again later", retry_after)
+    login_ip_throttle.hit(client_ip)
+
+    try:
+        user = await authenticate_user(user_login.username, user_login.password)
+    except PasswordPoolBusy:
+        raise _too_many_requests("Too many logins in progress, try again later", 1)
     if not user:
+        login_user_throttle.hit(username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    login_user_throttle.reset(username)
     access_token_expires = timedelta(minutes=1440)  # 24 hours
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -101,7 +334,10 @@ def create_admin_user(user_data: schemas.UserCreate, db: Session = Depends(get_d
         )
     
     # Create admin user
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = hash_password(user_data.password)
+    except PasswordPoolBusy:
+        raise _too_many_requests("Too many logins in progress, try again later", 1)
     new_user = models.User(
         username=user_data.username,
         email=user_data.email,
@@ -114,6 +350,7 @@ def create_admin_user(user_data: schemas.UserCreate, db: Session = Depends(get_d
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    user_cache.pop(new_user.username)
     
     return schemas.UserResponse(
         id=new_user.id,
@@ -136,6 +373,69 @@ def get_current_user_info(current_user: models.User = Depends(get_current_user))
         created_at=current_user.created_at
     )
 
+def _user_response(user: models.User) -> schemas.UserResponse:
+    return schemas.UserResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        is_active=user.is_active,
+        is_admin=user.is_admin,
+        created_at=user.created_at
+    )
+
+def _get_user_for_update(db: Session, user_id: int, current_user: models.User) -> models.User:
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.put("/admin/users/{user_id}", response_model=schemas.UserResponse)
+def update_user(
+    user_id: int,
+    user_data: schemas.UserUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Change a user's email, active flag or admin flag (admin only)."""
+    user = _get_user_for_update(db, user_id, current_user)
+    changes = user_data.dict(exclude_unset=True)
+    if user.username == current_user.username and (
+        changes.get("is_active") is False or changes.get("is_admin") is False
+    ):
+        raise HTTPException(status_code=400, detail="Cannot deactivate or demote yourself")
+
+    for field, value in changes.items():
+        setattr(user, field, value)
+    db.commit()
+    db.refresh(user)
+    # Other workers keep their copy until USER_CACHE_SECONDS have passed
+    user_cache.pop(user.username)
+
+    return _user_response(user)
+
+@router.delete("/admin/users/{user_id}")
+def delete_user(
+    user_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete a user (admin only)."""
+    user = _get_user_for_update(db, user_id, current_user)
+    if user.username == current_user.username:
+        raise HTTPException(status_code=400, detail="Cannot delete yourself")
+
+    username = user.username
+    db.delete(user)
+    db.commit()
+    user_cache.pop(username)
+
+    return {"message": "User deleted", "id": user_id}
+
 @router.get("/auth/check-setup")
 def check_setup(db: Session = Depends(get_db)):
     """Check if admin setup is required."""
@@ -143,13 +443,17 @@ def check_setup(db: Session = Depends(get_db)):
     return {"setup_required": user_count == 0}
 
 # Protected routes (require authentication)
-@router.get("/admin/bds/")
+@router.get("/admin/bds/", response_class=FastJSONResponse)
 def admin_list_bds(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor, replaces skip"),
     search: Optional[str] = Query(None, description="Search term for filtering"),
     sort_field: Optional[str] = Query(None, description="Field to sort by"),
     sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
+    with_total: bool = Query(False, description="Return {items, total} instead of a bare list"),
+    available_only: bool = Query(False, description="Only list BDs that are not rented"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -160,96 +464,42 @@ def admin_list_bds(
             detail="Not enough permissions"
         )
     
-    query = db.query(models.BD)
-    
-    # Apply search filter if provided
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.BD.titrealbum.ilike(search_term),
-                models.BD.titreserie.ilike(search_term),
-                models.BD.scenariste.ilike(search_term),
-                models.BD.dessinateur.ilike(search_term),
-                models.BD.editeur.ilike(search_term),
-                models.BD.collection.ilike(search_term),
-                models.BD.genre.ilike(search_term),
-                models.BD.cote.ilike(search_term)
+    # The desk works from the rental status in the database, never from
+    # the availability index, which lags the other workers
+    bids = _search_bds(db, search)
+    exclude_bids = None
+    if available_only:
+        bids, exclude_bids = _available_bds(db, bids, _open_rental_bids(db))
+    bds = _list_bd_page(db, response, bids, skip, limit, cursor, sort_field, sort_order, exclude_bids)
+
+    # One query on ix_locations_bid_fin for the open rentals of the page and
+    # their renters
+    renters = {}
+    if bds:
+        renters = {
+            bid: f"{nom} {prenom}" if nom is not None else None
+            for bid, nom, prenom in db.query(
+                models.Locations.bid, models.Membres.nom, models.Membres.prenom
+            ).outerjoin(
+                models.Membres, models.Locations.mid == models.Membres.mid
+            ).filter(
+                models.Locations.bid.in_([bd["bid"] for bd in bds]),
+                models.Locations.fin.is_(None)
             )
-        )
-    
-    # Apply sorting
-    if sort_field and hasattr(models.BD, sort_field):
-        column = getattr(models.BD, sort_field)
-        if sort_field == 'numtome':
-            # Special handling for numtome to sort as integers
-            if sort_order == "desc":
-                query = query.order_by(cast(column, Integer).desc())
-            else:
-                query = query.order_by(cast(column, Integer).asc())
-        else:
-            # For other fields, handle nulls and empty strings
-            if sort_order == "desc":
-                query = query.order_by(
-                    column.is_(None).desc(),
-                    (column == '').desc(),
-                    column.desc()
-                )
-            else:
-                query = query.order_by(
-                    column.is_(None),
-                    (column == ''),
-                    column.asc()
-                )
-    else:
-        # Default sorting
-        query = query.order_by(
-            models.BD.titreserie.is_(None),
-            models.BD.titreserie == '',
-            models.BD.titreserie.asc(),
-            cast(models.BD.numtome, Integer).asc()
-        )
-    
-    bds = query.offset(skip).limit(limit).all()
-    
-    # Add rental status to each BD
-    result = []
-    for bd in bds:
-        # Check if this BD is currently rented
-        active_rental = db.query(models.Locations).filter(
-            models.Locations.bid == bd.bid,
-            models.Locations.fin.is_(None)
-        ).first()
-        
-        bd_dict = {
-            "bid": bd.bid,
-            "cote": bd.cote,
-            "titreserie": bd.titreserie,
-            "titrealbum": bd.titrealbum,
-            "numtome": bd.numtome,
-            "scenariste": bd.scenariste,
-            "dessinateur": bd.dessinateur,
-            "collection": bd.collection,
-            "editeur": bd.editeur,
-            "genre": bd.genre,
-            "date_creation": bd.date_creation,
-            "date_modification": bd.date_modification,
-            "titre_norm": bd.titre_norm,
-            "serie_norm": bd.serie_norm,
-            "ISBN": bd.ISBN,
-            "is_rented": active_rental is not None,
-            "rented_by": None
         }
-        
-        # If rented, add information about who rented it
-        if active_rental:
-            member = db.query(models.Membres).filter(models.Membres.mid == active_rental.mid).first()
-            if member:
-                bd_dict["rented_by"] = f"{member.nom} {member.prenom}"
-        
-        result.append(bd_dict)
-    
-    return result
+
+    # Add rental status to each BD
+    result = [
+        {**bd, "is_rented": bd["bid"] in renters, "rented_by": renters.get(bd["bid"])}
+        for bd in bds
+    ]
+    
+    if with_total:
+        return FastJSONResponse(
+            {"items": result, "total": _count_bds(db, bids, exclude_bids)},
+            headers=dict(response.headers)
+        )
+    return FastJSONResponse(result, headers=dict(response.headers))
 
 # Protected admin routes (require authentication and admin privileges)
 @router.get("/admin/stats")
@@ -264,19 +514,125 @@ def get_admin_stats(
             detail="Not enough permissions"
         )
     
-    total_bds = db.query(models.BD).count()
-    total_membres = db.query(models.Membres).count()
-    total_locations = db.query(models.Locations).count()
-    active_locations = db.query(models.Locations).filter(models.Locations.fin.is_(None)).count()
+    # Maintained by the write endpoints, see app/stats.py
+    counters = stats.counters(db)
     
     return {
-        "total_bds": total_bds,
-        "total_membres": total_membres,
-        "total_locations": total_locations,
-        "active_locations": active_locations,
+        "total_bds": counters["bds"],
+        "total_membres": counters["membres"],
+        "total_locations": counters["locations"],
+        "active_locations": counters["active_locations"],
         "admin_user": current_user.username
     }
 
+def _stats_range(metric: str, start: Optional[date], end: Optional[date], default_days: int):
+    if metric not in stats.METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric, expected one of {', '.join(stats.METRICS)}")
+    end = end or date.today()
+    start = start or end - timedelta(days=default_days)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start, end
+
+@router.get("/admin/stats/series")
+def get_stats_series(
+    metric: str = Query("rentals", description="Metric to aggregate"),
+    period: str = Query("day", pattern="^(day|month)$", description="day or month"),
+    start: Optional[date] = Query(None, description="First day, defaults to 30 days (a year by month) before end"),
+    end: Optional[date] = Query(None, description="Last day, defaults to today"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a metric per day or per month, from the daily rollups."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    start, end = _stats_range(metric, start, end, 365 if period == "month" else 30)
+    if (end - start).days > 3660:
+        raise HTTPException(status_code=400, detail="Range is limited to 10 years")
+    return {
+        "metric": metric,
+        "period": period,
+        "start": start,
+        "end": end,
+        "series": stats.series(db, metric, start, end, period)
+    }
+
+@router.get("/admin/stats/top")
+def get_stats_top(
+    metric: str = Query("series_rentals", description="Metric with a dimension, e.g. series_rentals"),
+    start: Optional[date] = Query(None, description="First day, defaults to a year before end"),
+    end: Optional[date] = Query(None, description="Last day, defaults to today"),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the dimensions (e.g. series) with the highest totals of a metric."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    start, end = _stats_range(metric, start, end, 365)
+    return {
+        "metric": metric,
+        "start": start,
+        "end": end,
+        "top": stats.top(db, metric, start, end, limit)
+    }
+
+@router.post("/admin/stats/rebuild")
+def rebuild_stats(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Recompute the statistics from the base tables, after data was changed outside the API."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    stats.rebuild(db)
+    db.commit()
+    return {"message": "Statistics rebuilt", **stats.counters(db)}
+
+@router.get("/admin/cache-stats")
+def get_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """Get the hit rates of the in-process caches."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    return {
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "counts": count_cache.stats(),
+        "availability": availability_index.stats(),
+        "responses": response_cache.stats()
+    }
+
+@router.get("/admin/db-pool")
+def get_db_pool_stats(current_user: models.User = Depends(get_current_user)):
+    """Get the connection pool usage and checkout wait times."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    stats = {"profile": database.DB_PROFILE, "sync": database.pool_metrics(database.get_engine())}
+    async_engine = database.get_async_engine()
+    if async_engine is not None:
+        stats["async"] = database.pool_metrics(async_engine.sync_engine)
+    return stats
+
 # Protected admin endpoints for each section
 @router.get("/admin/bds/manage")
 def admin_manage_bds(
@@ -340,6 +696,9 @@ def create_bd(
     if existing:
         raise HTTPException(status_code=400, detail="Cote already exists")
 
+    # Stamped here like the importer does: the column's "CURRENT_TIMESTAMP"
+    # default is a string, which only MySQL accepts
+    now = datetime.utcnow()
     new_bd = models.BD(
         cote=bd_data.cote,
         titreserie=bd_data.titreserie,
@@ -352,15 +711,101 @@ def create_bd(
         genre=bd_data.genre,
         titre_norm=bd_data.titre_norm,
         serie_norm=bd_data.serie_norm,
-        ISBN=bd_data.ISBN
+        ISBN=bd_data.ISBN,
+        date_creation=now
     )
 
     db.add(new_bd)
+    stats.bds_created(db, now.date())
     db.commit()
     db.refresh(new_bd)
+    search_index.upsert(new_bd)
+    count_cache.pop(("bd", None))
+    catalogue_version.bump()
+    response_cache.bump()
 
     return schemas.BDResponse.from_orm(new_bd)
 
+# Rows validated before a batch is checked and inserted
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+def _iter_body_lines(request: Request):
+    """Iterate over the lines of the request body, from a worker thread.
+
+    Chunks are pulled from the event loop as the parser needs them, so the
+    upload is never held in memory as a whole.
+    """
+    chunks = request.stream()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    while True:
+        try:
+            chunk = anyio.from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            break
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def _import_bds(db: Session, lines, fmt: str):
+    report = []
+    seen_cotes = set()
+    batch = []
+
+    def flush():
+        entries, created = bd_import.import_batch(db, batch, seen_cotes)
+        report.extend(entries)
+        for bd in created:
+            search_index.upsert(bd)
+        batch.clear()
+
+    for row, bd, errors in bd_import.parse_rows(lines, fmt):
+        if bd is None:
+            report.append({"row": row, "status": "rejected", "errors": errors})
+            continue
+        batch.append((row, bd))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    if seen_cotes:
+        count_cache.pop(("bd", None))
+        catalogue_version.bump()
+        response_cache.bump()
+    report.sort(key=lambda entry: entry["row"])
+    return {
+        "created": len(seen_cotes),
+        "rejected": len(report) - len(seen_cotes),
+        "rows": report
+    }
+
+@router.post("/admin/bds/import")
+async def import_bds(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson, defaults to the Content-Type"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create BDs in bulk from a CSV (with a header row) or NDJSON upload (admin only)."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    fmt = format or bd_import.detect_format(request.headers.get("content-type"))
+    if fmt not in bd_import.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload must be text/csv or application/x-ndjson"
+        )
+
+    return await run_in_threadpool(_import_bds, db, _iter_body_lines(request), fmt)
+
 
 @router.put("/admin/bds/{bid}", response_model=schemas.BDResponse)
 def update_bd(
@@ -387,6 +832,9 @@ def update_bd(
 
     db.commit()
     db.refresh(bd)
+    search_index.upsert(bd)
+    catalogue_version.bump()
+    response_cache.bump()
 
     return schemas.BDResponse.from_orm(bd)
 
@@ -409,116 +857,193 @@ def delete_bd(
         raise HTTPException(status_code=404, detail="BD not found")
 
     db.delete(bd)
+    stats.bd_deleted(db)
     db.commit()
+    search_index.remove(bid)
+    count_cache.pop(("bd", None))
+    catalogue_version.bump()
+    response_cache.bump()
 
     return {"message": "BD deleted", "bid": bid}
 
+# Streaming exports
+EXPORT_FORMAT_PATTERN = f"^({'|'.join(exports.FORMATS)})$"
+
+def _export_response(query, name: str, format: str, gzip: bool):
+    headers = {"Content-Disposition": f'attachment; filename="{exports.filename(name, format, gzip)}"'}
+    return StreamingResponse(
+        exports.stream_rows(query, format, gzip),
+        media_type="application/gzip" if gzip else exports.MEDIA_TYPES[format],
+        headers=headers
+    )
+
+@router.get("/admin/export/bds")
+def export_bds(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream the whole catalogue as CSV or NDJSON (admin only)."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return _export_response(exports.bd_query(), "bds", format, gzip)
+
+@router.get("/admin/export/locations")
+def export_locations(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export"),
+    start: Optional[date] = Query(None, description="First rental date to include"),
+    end: Optional[date] = Query(None, description="Last rental date to include"),
+    mid: Optional[int] = Query(None, description="Only rentals of this member"),
+    open_only: bool = Query(False, description="Only rentals that are not returned yet"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream the rental history with its BDs and members as CSV or NDJSON (admin only)."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    query = exports.location_query(start=start, end=end, mid=mid, open_only=open_only)
+    return _export_response(query, "locations", format, gzip)
+
 # Public routes (no authentication required)
 # List BDs with pagination, search, and sorting
-@router.get("/bds/", response_model=list[schemas.BDBase])
-def list_bds(
+def _fetch_bds(db: Session, response: Response, search, skip, limit, cursor, sort_field, sort_order, with_total, available_only):
+    bids = _search_bds(db, search)
+    exclude_bids = None
+    if available_only:
+        bids, exclude_bids = _available_bds(db, bids)
+    bds = _list_bd_page(db, response, bids, skip, limit, cursor, sort_field, sort_order, exclude_bids)
+    if with_total:
+        return {"items": bds, "total": _count_bds(db, bids, exclude_bids)}
+    return bds
+
+async def _load_search_index(search: Optional[str]):
+    """Rebuild a stale search index in the threadpool before searching.
+
+    The rebuild takes about 200 ms of CPU on the full catalogue; in async
+    mode ``run_db`` would run it on the event loop.
+    """
+    if search and search_index.stale():
+        await run_db_in_threadpool(search_index.ensure_loaded)
+
+async def _render_bds(search, skip, limit, cursor, sort_field, sort_order, with_total, available_only):
+    """Fetch a catalogue page and serialize it, keeping the CPU-bound parts off the event loop."""
+    await _load_search_index(search)
+    page = Response()
+    data = await run_db(_fetch_bds, page, search, skip, limit, cursor, sort_field, sort_order, with_total, available_only)
+    return await run_in_threadpool(dumps, data), page.headers.get("X-Next-Cursor")
+
+def _cached_response(response: Response, entry):
+    body, next_cursor = entry
+    headers = dict(response.headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/bds/", response_model=Union[list[schemas.BDBase], schemas.BDPage], response_class=FastJSONResponse)
+async def list_bds(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor, replaces skip"),
     search: Optional[str] = Query(None, description="Search term for filtering"),
     sort_field: Optional[str] = Query(None, description="Field to sort by"),
     sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
-    db: Session = Depends(get_db)
+    with_total: bool = Query(False, description="Return {items, total} instead of a bare list"),
+    available_only: bool = Query(False, description="Only list BDs that are not rented")
 ):
-    query = db.query(models.BD)
-    
-    # Apply search filter if provided
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.BD.titrealbum.ilike(search_term),
-                models.BD.titreserie.ilike(search_term),
-                models.BD.scenariste.ilike(search_term),
-                models.BD.dessinateur.ilike(search_term),
-                models.BD.editeur.ilike(search_term),
-                models.BD.collection.ilike(search_term),
-                models.BD.genre.ilike(search_term),
-                models.BD.cote.ilike(search_term)
-            )
-        )
-    
-    # Apply sorting
-    if sort_field and hasattr(models.BD, sort_field):
-        column = getattr(models.BD, sort_field)
-        if sort_field == 'numtome':
-            # Special handling for numtome to sort as integers
-            if sort_order == "desc":
-                query = query.order_by(cast(column, Integer).desc())
-            else:
-                query = query.order_by(cast(column, Integer).asc())
-        else:
-            # For other fields, handle nulls and empty strings
-            if sort_order == "desc":
-                query = query.order_by(
-                    column.is_(None).desc(),
-                    (column == '').desc(),
-                    column.desc()
-                )
-            else:
-                query = query.order_by(
-                    column.is_(None),
-                    (column == ''),
-                    column.asc()
-                )
-    else:
-        # Default sorting
-        query = query.order_by(
-            models.BD.titreserie.is_(None),
-            models.BD.titreserie == '',
-            models.BD.titreserie.asc(),
-            cast(models.BD.numtome, Integer).asc()
-        )
-    
-    return query.offset(skip).limit(limit).all()
+    # Availability changes with every rental, which the catalogue version
+    # does not follow
+    etag = None
+    if not available_only:
+        etag = await catalogue_version.current()
+        not_modified = conditional_response(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+
+    # Same key for every spelling of the same query. The ETag is part of it,
+    # so that a body cached before another worker's edit is never served
+    # under the ETag of the edited catalogue
+    key = (
+        "bds",
+        etag,
+        normalize(search) if search else None,
+        0 if cursor else skip,
+        limit,
+        cursor,
+        sort_field if sort_field in BD_SORT_FIELDS else None,
+        "desc" if sort_order == "desc" else "asc",
+        with_total,
+        available_only
+    )
+    entry = await response_cache.get_or_load(key, lambda: _render_bds(
+        search, skip, limit, cursor, sort_field, sort_order, with_total, available_only
+    ))
+    return _cached_response(response, entry)
 
 # Get BD statistics and total count
+def _fetch_bds_count(db: Session, search):
+    # Searches are counted straight from the search index
+    return _count_bds(db, _search_bds(db, search))
+
+async def _render_bds_count(search):
+    await _load_search_index(search)
+    return dumps({"total": await run_db(_fetch_bds_count, search)}), None
+
 @router.get("/bds/count")
-def get_bds_count(
-    search: Optional[str] = Query(None, description="Search term for filtering"),
-    db: Session = Depends(get_db)
+async def get_bds_count(
+    request: Request,
+    response: Response,
+    search: Optional[str] = Query(None, description="Search term for filtering")
 ):
-    query = db.query(models.BD)
-    
-    # Apply search filter if provided
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.BD.titrealbum.ilike(search_term),
-                models.BD.titreserie.ilike(search_term),
-                models.BD.scenariste.ilike(search_term),
-                models.BD.dessinateur.ilike(search_term),
-                models.BD.editeur.ilike(search_term),
-                models.BD.collection.ilike(search_term),
-                models.BD.genre.ilike(search_term),
-                models.BD.cote.ilike(search_term)
-            )
-        )
-    
-    total = query.count()
-    return {"total": total}
+    etag = await catalogue_version.current()
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    key = ("bds/count", etag, normalize(search) if search else None)
+    entry = await response_cache.get_or_load(key, lambda: _render_bds_count(search))
+    return _cached_response(response, entry)
 
 # Get single BD by ID
+def _fetch_bd(db: Session, bid):
+    return db.query(models.BD).filter(models.BD.bid == bid).first()
+
 @router.get("/bds/{bid}", response_model=schemas.BDBase)
-def get_bd(bid: str, db: Session = Depends(get_db)):
-    bd = db.query(models.BD).filter(models.BD.bid == bid).first()
+async def get_bd(bid: str, request: Request, response: Response):
+    not_modified = conditional_response(request, response, await catalogue_version.current())
+    if not_modified is not None:
+        return not_modified
+    bd = await run_db(_fetch_bd, bid)
     if bd is None:
         raise HTTPException(status_code=404, detail="BD not found")
     return bd
 
 # Member management routes
-@router.get("/admin/membres/")
+# Member columns returned by the member list, in table order
+MEMBER_LIST_COLUMNS = [
+    models.Membres.mid, models.Membres.nom, models.Membres.prenom, models.Membres.gsm,
+    models.Membres.rue, models.Membres.numero, models.Membres.boite, models.Membres.codepostal,
+    models.Membres.ville, models.Membres.mail, models.Membres.caution, models.Membres.remarque,
+    models.Membres.bdpass, models.Membres.abonnement, models.Membres.vip, models.Membres.IBAN,
+    models.Membres.groupe
+]
+
+@router.get("/admin/membres/", response_class=FastJSONResponse)
 def get_members_with_rental_count(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     search: Optional[str] = Query(None, description="Search term for member name"),
     sort_field: Optional[str] = Query("nom", description="Field to sort by"),
     sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
+    with_total: bool = Query(False, description="Return {items, total} instead of a bare list"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -529,40 +1054,28 @@ def get_members_with_rental_count(
             detail="Not enough permissions"
         )
     
-    query = db.query(models.Membres)
+    # Subquery to count active rentals per member, joined in for every sort
+    # so the whole page is fetched in a single statement
+    active_rentals_subq = (
+        db.query(
+            models.Locations.mid,
+            func.count(models.Locations.lid).label('rental_count')
+        )
+        .filter(models.Locations.fin.is_(None))
+        .group_by(models.Locations.mid)
+        .subquery()
+    )
+    rental_count_col = func.coalesce(active_rentals_subq.c.rental_count, 0)
+
+    query = db.query(*MEMBER_LIST_COLUMNS, rental_count_col.label("active_rentals")).outerjoin(
+        active_rentals_subq, models.Membres.mid == active_rentals_subq.c.mid
+    )
     
     # Apply search filter if provided
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.Membres.nom.ilike(search_term),
-                models.Membres.prenom.ilike(search_term),
-                models.Membres.groupe.ilike(search_term)
-            )
-        )
+    query = _filter_members(query, search)
     
     # Apply sorting
     if sort_field == 'active_rentals':
-        # For active_rentals, we need to sort by the count of active rentals
-        # This requires a more complex query with subquery
-        from sqlalchemy import func
-        
-        # Subquery to count active rentals per member
-        active_rentals_subq = (
-            db.query(
-                models.Locations.mid,
-                func.count(models.Locations.lid).label('rental_count')
-            )
-            .filter(models.Locations.fin.is_(None))
-            .group_by(models.Locations.mid)
-            .subquery()
-        )
-        
-        # Join with the subquery and sort
-        query = query.outerjoin(active_rentals_subq, models.Membres.mid == active_rentals_subq.c.mid)
-        rental_count_col = func.coalesce(active_rentals_subq.c.rental_count, 0)
-        
         if sort_order.lower() == 'desc':
             query = query.order_by(rental_count_col.desc())
         else:
@@ -578,39 +1091,11 @@ def get_members_with_rental_count(
         # Default sort by nom
         query = query.order_by(models.Membres.nom.asc())
     
-    members = query.offset(skip).limit(limit).all()
-    
-    # Add rental count to each member
-    result = []
-    for member in members:
-        active_rentals = db.query(models.Locations).filter(
-            models.Locations.mid == member.mid,
-            models.Locations.fin.is_(None)
-        ).count()
-        
-        member_dict = {
-            "mid": member.mid,
-            "nom": member.nom,
-            "prenom": member.prenom,
-            "gsm": member.gsm,
-            "rue": member.rue,
-            "numero": member.numero,
-            "boite": member.boite,
-            "codepostal": member.codepostal,
-            "ville": member.ville,
-            "mail": member.mail,
-            "caution": member.caution,
-            "remarque": member.remarque,
-            "bdpass": member.bdpass,
-            "abonnement": member.abonnement,
-            "vip": member.vip,
-            "IBAN": member.IBAN,
-            "groupe": member.groupe,
-            "active_rentals": active_rentals
-        }
-        result.append(member_dict)
+    result = [dict(row._mapping) for row in query.offset(skip).limit(limit)]
     
-    return result
+    if with_total:
+        return FastJSONResponse({"items": result, "total": _count_members(db, search)})
+    return FastJSONResponse(result)
 
 @router.get("/admin/membres/count")
 def get_members_count(
@@ -625,20 +1110,7 @@ def get_members_count(
             detail="Not enough permissions"
         )
     
-    query = db.query(models.Membres)
-    
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.Membres.nom.ilike(search_term),
-                models.Membres.prenom.ilike(search_term),
-                models.Membres.groupe.ilike(search_term)
-            )
-        )
-    
-    total = query.count()
-    return {"total": total}
+    return {"total": _count_members(db, search)}
 
 @router.get("/admin/membres/{member_id}")
 def get_member_details(
@@ -712,6 +1184,8 @@ def update_member(
     
     db.commit()
     db.refresh(member)
+    # Cached member counts depend on names and groups
+    count_cache.clear()
     
     return {
         "mid": member.mid,
@@ -733,7 +1207,11 @@ def update_member(
         "groupe": member.groupe
     }
 
-@router.get("/admin/membres/{member_id}/rentals")
+# BD columns nested as "bd_info" in the rental lists
+RENTAL_BD_FIELDS = ("bid", "cote", "titreserie", "titrealbum", "numtome", "scenariste", "dessinateur")
+RENTAL_BD_COLUMNS = [getattr(models.BD, field) for field in RENTAL_BD_FIELDS]
+
+@router.get("/admin/membres/{member_id}/rentals", response_class=FastJSONResponse)
 def get_member_rentals(
     member_id: int,
     current_user: models.User = Depends(get_current_user),
@@ -746,32 +1224,30 @@ def get_member_rentals(
             detail="Not enough permissions"
         )
     
-    rentals = db.query(models.Locations, models.BD).join(
+    rentals = db.query(
+        models.Locations.lid, models.Locations.date, models.Locations.debut, *RENTAL_BD_COLUMNS
+    ).join(
         models.BD, models.Locations.bid == models.BD.bid
     ).filter(
         models.Locations.mid == member_id,
         models.Locations.fin.is_(None)
-    ).all()
+    ).order_by(
+        # Oldest first, as before the member's rentals had a second index
+        models.Locations.lid
+    )
     
     result = []
-    for location, bd in rentals:
+    for lid, rented_on, debut, *bd in rentals:
+        bd_info = dict(zip(RENTAL_BD_FIELDS, bd))
         result.append({
-            "lid": location.lid,
-            "bid": location.bid,
-            "date": location.date,
-            "debut": location.debut,
-            "bd_info": {
-                "bid": bd.bid,
-                "cote": bd.cote,
-                "titreserie": bd.titreserie,
-                "titrealbum": bd.titrealbum,
-                "numtome": bd.numtome,
-                "scenariste": bd.scenariste,
-                "dessinateur": bd.dessinateur
-            }
+            "lid": lid,
+            "bid": bd_info["bid"],
+            "date": rented_on,
+            "debut": debut,
+            "bd_info": bd_info
         })
     
-    return result
+    return FastJSONResponse(result)
 
 @router.post("/admin/rentals/{rental_id}/return")
 def return_book(
@@ -794,7 +1270,10 @@ def return_book(
         raise HTTPException(status_code=400, detail="Book already returned")
     
     rental.fin = datetime.utcnow()
+    stats.rental_returned(db, rental.fin.date())
     db.commit()
+    availability_index.release(rental.bid, rental.lid)
+    response_cache.bump()
     
     return {"message": "Book returned successfully", "rental_id": rental_id}
 
@@ -812,41 +1291,202 @@ def rent_book_to_member(
             detail="Not enough permissions"
         )
     
-    # Check if member exists
-    member = db.query(models.Membres).filter(models.Membres.mid == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-    
-    # Check if BD exists
-    bd = db.query(models.BD).filter(models.BD.bid == bd_id).first()
-    if not bd:
+    # A single guarded INSERT: it inserts nothing when the member or the BD
+    # does not exist, and the unique open_bid index rejects a second open
+    # rental of the BD, however many checkouts race for it
+    today = datetime.now().date()
+    try:
+        result = db.execute(
+            insert(models.Locations.__table__).from_select(
+                ["bid", "mid", "date", "debut", "paye", "mail_rappel_1_envoye", "mail_rappel_2_envoye"],
+                select(
+                    models.BD.bid, models.Membres.mid, literal(today, Date), literal(datetime.utcnow(), TIMESTAMP),
+                    false(), false(), false()
+                ).join(
+                    models.Membres, models.Membres.mid == member_id
+                ).where(models.BD.bid == bd_id)
+            )
+        )
+    except IntegrityError:
+        db.rollback()
+        if availability_index.refresh(db, bd_id) is not None:
+            raise HTTPException(status_code=400, detail="Book is already rented")
+        raise
+    if result.rowcount == 0:
+        if db.query(models.Membres.mid).filter(models.Membres.mid == member_id).first() is None:
+            raise HTTPException(status_code=404, detail="Member not found")
         raise HTTPException(status_code=404, detail="BD not found")
+    rental_id = result.lastrowid
     
-    # Check if book is already rented
-    existing_rental = db.query(models.Locations).filter(
-        models.Locations.bid == bd_id,
-        models.Locations.fin.is_(None)
-    ).first()
-    
-    if existing_rental:
-        raise HTTPException(status_code=400, detail="Book is already rented")
-    
-    # Create new rental
-    new_rental = models.Locations(
-        bid=bd_id,
-        mid=member_id,
-        date=datetime.now().date(),
-        debut=datetime.utcnow(),
-        paye=False,
-        mail_rappel_1_envoye=False,
-        mail_rappel_2_envoye=False
-    )
-    
-    db.add(new_rental)
+    titreserie = db.query(models.BD.titreserie).filter(models.BD.bid == bd_id).scalar()
+    stats.rental_started(db, today, titreserie)
+    stats.members_rented(db, {member_id: 1})
     db.commit()
-    db.refresh(new_rental)
+    availability_index.rent(bd_id, rental_id, member_id)
+    response_cache.bump()
     
-    return {"message": "Book rented successfully", "rental_id": new_rental.lid}
+    return {"message": "Book rented successfully", "rental_id": rental_id}
+
+# Times a batch checkout is retried when a BD of the batch is rented concurrently
+RENT_BATCH_ATTEMPTS = 3
+
+@router.post("/admin/membres/{member_id}/rent")
+def rent_books_to_member(
+    member_id: int,
+    batch: schemas.RentBatch,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Rent several books to a member in one transaction, with a result per book."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    if db.query(models.Membres.mid).filter(models.Membres.mid == member_id).first() is None:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    requested = list(dict.fromkeys(batch.bids))
+    errors = {}
+    for attempt in range(RENT_BATCH_ATTEMPTS):
+        # Lock the requested BDs, so that a concurrent checkout of the same BD
+        # waits for this one and then sees its rental
+        candidates = [bid for bid in requested if bid not in errors]
+        series = dict(
+            db.query(models.BD.bid, models.BD.titreserie)
+            .filter(models.BD.bid.in_(candidates))
+            .with_for_update()
+            .all()
+        )
+        rented = {
+            bid for (bid,) in db.query(models.Locations.bid).filter(
+                models.Locations.bid.in_(list(series)),
+                models.Locations.fin.is_(None)
+            )
+        }
+
+        to_rent = []
+        for bid in candidates:
+            if bid not in series:
+                errors[bid] = "BD not found"
+            elif bid in rented:
+                errors[bid] = "Book is already rented"
+            else:
+                to_rent.append(bid)
+        if not to_rent:
+            break
+
+        today = datetime.now().date()
+        now = datetime.utcnow()
+        try:
+            db.execute(insert(models.Locations.__table__), [
+                {
+                    "bid": bid,
+                    "mid": member_id,
+                    "date": today,
+                    "debut": now,
+                    "paye": False,
+                    "mail_rappel_1_envoye": False,
+                    "mail_rappel_2_envoye": False,
+                }
+                for bid in to_rent
+            ])
+        except IntegrityError:
+            # Only possible if a BD was rented without taking its row lock:
+            # check the batch again, which rejects the BDs rented meanwhile
+            db.rollback()
+            continue
+        break
+    else:
+        raise HTTPException(status_code=409, detail="The books kept being rented concurrently, try again")
+
+    rental_ids = {}
+    if to_rent:
+        # The BDs are locked, so their open rentals are the ones just inserted
+        rental_ids = dict(
+            db.query(models.Locations.bid, models.Locations.lid)
+            .filter(models.Locations.bid.in_(to_rent), models.Locations.fin.is_(None))
+            .all()
+        )
+        stats.rentals_started(db, today, [series[bid] for bid in to_rent])
+        stats.members_rented(db, {member_id: len(to_rent)})
+    db.commit()
+
+    for bid in to_rent:
+        availability_index.rent(bid, rental_ids[bid], member_id)
+    if to_rent:
+        response_cache.bump()
+
+    results = []
+    seen = set()
+    for bid in batch.bids:
+        if bid in seen:
+            results.append({"bid": bid, "status": "rejected", "errors": ["Duplicate BD in request"]})
+        elif bid in errors:
+            results.append({"bid": bid, "status": "rejected", "errors": [errors[bid]]})
+        else:
+            results.append({"bid": bid, "status": "rented", "rental_id": rental_ids[bid]})
+        seen.add(bid)
+    return {"member_id": member_id, "rented": len(to_rent), "results": results}
+
+@router.post("/admin/rentals/return")
+def return_books(
+    batch: schemas.ReturnBatch,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark several books as returned in one transaction, with a result per rental."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    requested = list(dict.fromkeys(batch.lids))
+    rentals = {
+        lid: (bid, fin)
+        for lid, bid, fin in db.query(models.Locations.lid, models.Locations.bid, models.Locations.fin)
+        .filter(models.Locations.lid.in_(requested))
+        .with_for_update()
+    }
+
+    errors = {}
+    to_return = []
+    for lid in requested:
+        if lid not in rentals:
+            errors[lid] = "Rental not found"
+        elif rentals[lid][1] is not None:
+            errors[lid] = "Book already returned"
+        else:
+            to_return.append(lid)
+
+    if to_return:
+        now = datetime.utcnow()
+        db.execute(
+            update(models.Locations.__table__)
+            .where(models.Locations.lid.in_(to_return), models.Locations.fin.is_(None))
+            .values(fin=now)
+        )
+        stats.rental_returned(db, now.date(), len(to_return))
+    db.commit()
+
+    for lid in to_return:
+        availability_index.release(rentals[lid][0], lid)
+    if to_return:
+        response_cache.bump()
+
+    results = []
+    seen = set()
+    for lid in batch.lids:
+        if lid in seen:
+            results.append({"rental_id": lid, "status": "rejected", "errors": ["Duplicate rental in request"]})
+        elif lid in errors:
+            results.append({"rental_id": lid, "status": "rejected", "errors": [errors[lid]]})
+        else:
+            results.append({"rental_id": lid, "status": "returned", "bid": rentals[lid][0]})
+        seen.add(lid)
+    return {"returned": len(to_return), "results": results}
 
 @router.post("/admin/membres/")
 def create_member(
@@ -901,8 +1541,11 @@ def create_member(
     )
     
     db.add(new_member)
+    stats.member_created(db, date.today())
     db.commit()
     db.refresh(new_member)
+    # Cached member counts depend on names and groups
+    count_cache.clear()
     
     return {
         "mid": new_member.mid,
@@ -924,56 +1567,73 @@ def create_member(
         "groupe": new_member.groupe
     }
 
-@router.get("/admin/membres/{member_id}/rental-history")
+# Keyset order of a member's rental history, served by ix_locations_mid_debut
+RENTAL_HISTORY_KEY = [(models.Locations.debut, True), (models.Locations.lid, False)]
+RENTAL_HISTORY_SORT = "debut:desc"
+
+@router.get("/admin/membres/{member_id}/rental-history", response_class=FastJSONResponse)
 def get_member_rental_history(
     member_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor, replaces skip"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get member's rental history with pagination."""
+    """Get member's rental history with pagination.
+
+    Pages are read newest first from the ``(mid, debut DESC, lid)`` index,
+    by keyset cursor if one is given or by offset otherwise. The total is
+    the member's maintained ``nb_locations``.
+    """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
     
-    # Get total count
-    total = db.query(models.Locations).filter(
-        models.Locations.mid == member_id
-    ).count()
+    total = db.query(models.Membres.nb_locations).filter(
+        models.Membres.mid == member_id
+    ).scalar() or 0
     
     # Get rentals with pagination
-    rentals = db.query(models.Locations, models.BD).join(
+    rentals = db.query(
+        models.Locations.lid, models.Locations.date, models.Locations.debut,
+        models.Locations.fin, models.Locations.paye, *RENTAL_BD_COLUMNS
+    ).join(
         models.BD, models.Locations.bid == models.BD.bid
     ).filter(
         models.Locations.mid == member_id
-    ).order_by(
-        models.Locations.debut.desc()
-    ).offset(skip).limit(limit).all()
+    )
+    rentals = apply_sort(rentals, RENTAL_HISTORY_KEY)
+    if cursor:
+        try:
+            values = decode_cursor(cursor, RENTAL_HISTORY_SORT, len(RENTAL_HISTORY_KEY))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        rentals = rentals.filter(keyset_filter(RENTAL_HISTORY_KEY, values))
+    else:
+        rentals = rentals.offset(skip)
+    rentals = rentals.limit(limit).all()
     
     result = []
-    for location, bd in rentals:
+    for lid, rented_on, debut, fin, paye, *bd in rentals:
+        bd_info = dict(zip(RENTAL_BD_FIELDS, bd))
         result.append({
-            "lid": location.lid,
-            "bid": location.bid,
-            "date_location": location.date,
-            "date_debut": location.debut,
-            "date_retour": location.fin,
-            "paye": location.paye,
-            "bd_info": {
-                "bid": bd.bid,
-                "cote": bd.cote,
-                "titreserie": bd.titreserie,
-                "titrealbum": bd.titrealbum,
-                "numtome": bd.numtome,
-                "scenariste": bd.scenariste,
-                "dessinateur": bd.dessinateur
-            }
+            "lid": lid,
+            "bid": bd_info["bid"],
+            "date_location": rented_on,
+            "date_debut": debut,
+            "date_retour": fin,
+            "paye": paye,
+            "bd_info": bd_info
         })
     
-    return {
+    response = FastJSONResponse({
         "rentals": result,
         "total": total
-    }
+    })
+    if len(rentals) == limit:
+        last = rentals[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(RENTAL_HISTORY_SORT, (last.debut, last.lid))
+    return response
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date, datetime
 
 class UserCreate(BaseModel):
@@ -19,6 +19,11 @@ class UserResponse(BaseModel):
     is_admin: bool
     created_at: Optional[datetime]
 
+class UserUpdate(BaseModel):
+    email: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -59,6 +64,10 @@ class BDResponse(BDBase):
     class Config:
         from_attributes = True
 
+class BDPage(BaseModel):
+    items: list[BDResponse]
+    total: int
+
 class MembresBase(BaseModel):
     mid: Optional[int] = None
     nom: str
@@ -133,3 +142,12 @@ class LocationsResponse(LocationsBase):
     lid: int
     class Config:
         from_attributes = True
+
+# Largest desk transaction accepted by the batch rent and return endpoints
+MAX_BATCH_ITEMS = 50
+
+class RentBatch(BaseModel):
+    bids: List[int] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+class ReturnBatch(BaseModel):
+    lids: List[int] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
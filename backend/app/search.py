@@ -0,0 +1,187 @@
+"""
+In-process search index for the BD catalogue.
+
+Filtering with ``ilike('%term%')`` across the searchable columns cannot use a
+MySQL index, so every search used to scan the whole ``bd`` table (twice, once
+for the page and once for the count). This module keeps an accent- and
+case-insensitive trigram index of those columns in memory and resolves a
+search term to the set of matching ``bid`` values, which the routes then turn
+into a primary key lookup.
+
+Matching keeps the substring semantics of the old ILIKE filter: a BD matches
+when the search term appears anywhere in one of its searchable fields, which
+also covers prefix matching. Accents and case are ignored on both sides.
+
+Terms shorter than a trigram cannot use the postings and match a large part
+of the catalogue, so ``search`` returns None for them and the routes filter
+with ILIKE in the query instead of sending thousands of bids back to the
+database. The routes do the same for terms matching more BDs than they
+are willing to list in an ``IN (...)``.
+
+A rebuild reads and indexes the table without holding the lock, so searches
+keep being answered from the previous index meanwhile; the new one is
+swapped in at the end, with the edits made during the rebuild replayed.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Columns covered by the catalogue search, in the order the old ILIKE filter used
+SEARCH_FIELDS = (
+    "titrealbum",
+    "titreserie",
+    "scenariste",
+    "dessinateur",
+    "editeur",
+    "collection",
+    "genre",
+    "cote",
+)
+
+# Rebuild the index from the database after this many seconds, so that edits
+# made by other worker processes are eventually picked up
+REFRESH_SECONDS = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+
+# Separator between fields, so that a term never matches across two columns
+_FIELD_SEPARATOR = "\x1f"
+
+# Shortest term the index answers, one trigram
+MIN_TERM_LENGTH = 3
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase a string and strip its accents."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _index(documents: Dict[int, str], postings: Dict[str, Set[int]], bid: int, values: Iterable[Optional[str]]):
+    document = _FIELD_SEPARATOR.join(normalize(value) for value in values)
+    documents[bid] = document
+    for gram in _trigrams(document):
+        postings.setdefault(gram, set()).add(bid)
+
+
+class SearchIndex:
+    """Trigram index over the searchable BD columns."""
+
+    def __init__(self, refresh_seconds: int = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        # Held by the one thread rebuilding the index
+        self._load_lock = threading.RLock()
+        self._documents: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+        # Edits made while a rebuild runs, as (bid, values or None if deleted)
+        self._edits: Optional[List[tuple]] = None
+
+    def _add(self, bid: int, values: Iterable[Optional[str]]):
+        _index(self._documents, self._postings, bid, values)
+
+    def _discard(self, bid: int):
+        document = self._documents.pop(bid, None)
+        if document is None:
+            return
+        for gram in _trigrams(document):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(bid)
+                if not postings:
+                    del self._postings[gram]
+
+    def load(self, db: Session):
+        """(Re)build the whole index from the ``bd`` table."""
+        with self._load_lock:
+            self._rebuild(db)
+
+    def _rebuild(self, db: Session):
+        with self._lock:
+            self._edits = []
+        try:
+            columns = [getattr(models.BD, field) for field in SEARCH_FIELDS]
+            documents: Dict[int, str] = {}
+            postings: Dict[str, Set[int]] = {}
+            for row in db.query(models.BD.bid, *columns).all():
+                _index(documents, postings, row[0], row[1:])
+            with self._lock:
+                self._documents = documents
+                self._postings = postings
+                for bid, values in self._edits:
+                    self._discard(bid)
+                    if values is not None:
+                        self._add(bid, values)
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._edits = None
+
+    def stale(self) -> bool:
+        """Whether the next search rebuilds the index first."""
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds
+
+    def ensure_loaded(self, db: Session):
+        """Build the index if it is missing or older than ``refresh_seconds``."""
+        if not self.stale():
+            return
+        # A single thread rebuilds; the others keep searching the current
+        # index, and only wait when there is none yet
+        if self._load_lock.acquire(blocking=self._loaded_at is None):
+            try:
+                if self.stale():
+                    self.load(db)
+            finally:
+                self._load_lock.release()
+
+    def upsert(self, bd: models.BD):
+        """Index a created or updated BD."""
+        values = tuple(getattr(bd, field) for field in SEARCH_FIELDS)
+        with self._lock:
+            if self._edits is not None:
+                self._edits.append((bd.bid, values))
+            if self._loaded_at is None:
+                return
+            self._discard(bd.bid)
+            self._add(bd.bid, values)
+
+    def remove(self, bid: int):
+        """Drop a deleted BD from the index."""
+        with self._lock:
+            if self._edits is not None:
+                self._edits.append((bid, None))
+            self._discard(bid)
+
+    def search(self, db: Session, term: str) -> Optional[List[int]]:
+        """Return the bids of all BDs with a field containing ``term``.
+
+        Returns None when the term is shorter than ``MIN_TERM_LENGTH``, the
+        caller then has to filter in SQL.
+        """
+        needle = normalize(term)
+        if len(needle) < MIN_TERM_LENGTH:
+            return None
+        self.ensure_loaded(db)
+        with self._lock:
+            postings = sorted(
+                (self._postings.get(gram, set()) for gram in _trigrams(needle)),
+                key=len
+            )
+            candidates = set.intersection(*postings)
+            return [bid for bid in candidates if needle in self._documents[bid]]
+
+
+search_index = SearchIndex()
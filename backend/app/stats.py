@@ -0,0 +1,290 @@
+"""
+Incrementally maintained statistics.
+
+``/admin/stats`` used to count ``bd``, ``membres`` and ``locations`` (twice)
+on every admin page load, and every COUNT(*) is a full index scan. Instead,
+the write endpoints add their deltas to two tables, in the same transaction
+as the write itself:
+
+- ``stats_counters`` holds running totals, read back by primary key;
+- ``stats_rollup`` holds daily totals per metric, optionally broken down by
+  a dimension (the series of a rented BD), from which time series and top
+  lists are aggregated.
+
+Both are updated with a dialect-specific upsert that adds to the stored
+value, so concurrent writers never lose an increment; other dialects fall
+back to an UPDATE followed, for new keys, by an INSERT. The rental total of
+each member is kept the same way, in ``membres.nb_locations``. ``rebuild`` recomputes
+everything from the base tables, for the initial backfill or after data
+was changed behind the application's back.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, bindparam, delete, func, inspect, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+COUNTERS = ("bds", "membres", "locations", "active_locations")
+
+METRICS = {
+    "rentals": "Rentals started",
+    "returns": "Books returned",
+    "new_bds": "BDs added to the catalogue",
+    "new_members": "Members created",
+    "series_rentals": "Rentals per series",
+}
+
+PERIODS = ("day", "month")
+
+counters_table = models.StatCounter.__table__
+rollup_table = models.StatRollup.__table__
+
+
+def _connection(db):
+    # Statistics are written both through sessions and, by migrations, connections
+    return db.connection() if isinstance(db, Session) else db
+
+
+def _upsert(db, table, key_columns: Tuple[str, ...], rows: List[dict]):
+    """Insert rows, adding ``value`` to the stored one when the key already exists."""
+    if not rows:
+        return
+    # Always lock rows in the same order, so concurrent writers cannot deadlock
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in key_columns))
+    dialect = _connection(db).dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(value=table.c.value + stmt.inserted.value)
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={"value": table.c.value + stmt.excluded.value}
+        )
+    else:
+        _update_or_insert(db, table, key_columns, rows)
+        return
+    db.execute(stmt, rows)
+
+
+def _update_or_insert(db, table, key_columns: Tuple[str, ...], rows: List[dict]):
+    """Portable ``_upsert``: UPDATE each row, and INSERT it when no row matched.
+
+    Two writers inserting the same new key race: the loser's INSERT fails on
+    the primary key inside a savepoint and its delta is added by an UPDATE
+    instead.
+    """
+    matches = [table.c[key] == bindparam(f"k_{key}") for key in key_columns]
+    add = update(table).where(*matches).values(value=table.c.value + bindparam("k_value"))
+    for row in rows:
+        params = {f"k_{key}": value for key, value in row.items()}
+        if db.execute(add, params).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(table.insert(), row)
+        except IntegrityError:
+            db.execute(add, params)
+
+
+def record(db, counters: Optional[Dict[str, int]] = None, rollups: Iterable[Tuple[str, date, str, int]] = ()):
+    """Add counter deltas and ``(metric, day, dimension, delta)`` rollups.
+
+    Runs in the caller's transaction, so the statistics are committed or
+    rolled back together with the write they describe.
+    """
+    _upsert(db, counters_table, ("name",), [
+        {"name": name, "value": delta}
+        for name, delta in (counters or {}).items() if delta
+    ])
+    _upsert(db, rollup_table, ("metric", "day", "dimension"), [
+        {"metric": metric, "day": day, "dimension": dimension or "", "value": delta}
+        for metric, day, dimension, delta in rollups if delta
+    ])
+
+
+def rental_started(db, day: date, titreserie: Optional[str]):
+    rentals_started(db, day, [titreserie])
+
+
+def rentals_started(db, day: date, titreseries: Iterable[Optional[str]]):
+    """Record several rentals at once, with one upsert per table."""
+    per_series = Counter(titreserie or "" for titreserie in titreseries)
+    count = sum(per_series.values())
+    record(
+        db,
+        {"locations": count, "active_locations": count},
+        [("rentals", day, "", count)] + [
+            ("series_rentals", day, titreserie, n) for titreserie, n in per_series.items()
+        ]
+    )
+
+
+def members_rented(db, rentals: Dict[int, int]):
+    """Add ``rentals[mid]`` new rentals to the total of each member."""
+    # Sorted, for the same lock order as the upserts
+    rows = [{"m_mid": mid, "m_count": count} for mid, count in sorted(rentals.items()) if count]
+    if not rows:
+        return
+    membres = models.Membres.__table__
+    db.execute(
+        update(membres)
+        .where(membres.c.mid == bindparam("m_mid"))
+        .values(nb_locations=membres.c.nb_locations + bindparam("m_count")),
+        rows
+    )
+
+
+def rental_returned(db, day: date, count: int = 1):
+    record(db, {"active_locations": -count}, [("returns", day, "", count)])
+
+
+def bds_created(db, day: date, count: int = 1):
+    record(db, {"bds": count}, [("new_bds", day, "", count)])
+
+
+def bd_deleted(db):
+    record(db, {"bds": -1})
+
+
+def member_created(db, day: date):
+    record(db, {"membres": 1}, [("new_members", day, "", 1)])
+
+
+def counters(db) -> Dict[str, int]:
+    """Return every counter, in a single primary key read."""
+    values = dict(db.execute(select(counters_table.c.name, counters_table.c.value)).all())
+    return {name: values.get(name, 0) for name in COUNTERS}
+
+
+def series(db, metric: str, start: date, end: date, period: str = "day") -> List[dict]:
+    """Totals of a metric per day or per month between ``start`` and ``end``, gaps included."""
+    rows = db.execute(
+        select(rollup_table.c.day, func.sum(rollup_table.c.value))
+        .where(
+            rollup_table.c.metric == metric,
+            rollup_table.c.day >= start,
+            rollup_table.c.day <= end
+        )
+        .group_by(rollup_table.c.day)
+    ).all()
+
+    def bucket(day: date) -> date:
+        return day.replace(day=1) if period == "month" else day
+
+    totals: Dict[date, int] = {}
+    day = start
+    while day <= end:
+        totals.setdefault(bucket(day), 0)
+        day += timedelta(days=1)
+    for day, value in rows:
+        totals[bucket(day)] += int(value)
+    return [{"period": key.isoformat(), "value": value} for key, value in sorted(totals.items())]
+
+
+def top(db, metric: str, start: date, end: date, limit: int = 10) -> List[dict]:
+    """Dimensions of a metric with the highest totals between ``start`` and ``end``."""
+    total = func.sum(rollup_table.c.value).label("total")
+    rows = db.execute(
+        select(rollup_table.c.dimension, total)
+        .where(
+            rollup_table.c.metric == metric,
+            rollup_table.c.day >= start,
+            rollup_table.c.day <= end
+        )
+        .group_by(rollup_table.c.dimension)
+        .order_by(total.desc(), rollup_table.c.dimension)
+        .limit(limit)
+    ).all()
+    return [{"dimension": dimension, "value": int(value)} for dimension, value in rows]
+
+
+def recount_member_rentals(db):
+    """Recompute the rental total of every member from ``locations``."""
+    Membres, Locations = models.Membres, models.Locations
+    db.execute(
+        update(Membres.__table__).values(
+            nb_locations=select(func.count())
+            .where(Locations.mid == Membres.mid)
+            .scalar_subquery()
+        )
+    )
+
+
+def rebuild(db):
+    """Recompute all counters, rollups and member totals from the base tables, in the caller's transaction."""
+    BD, Membres, Locations = models.BD, models.Membres, models.Locations
+    member_columns = {c["name"] for c in inspect(_connection(db)).get_columns("membres")}
+
+    totals = {
+        "bds": db.execute(select(func.count()).select_from(BD)).scalar(),
+        "membres": db.execute(select(func.count()).select_from(Membres)).scalar(),
+        "locations": db.execute(select(func.count()).select_from(Locations)).scalar(),
+        "active_locations": db.execute(
+            select(func.count()).select_from(Locations).where(Locations.fin.is_(None))
+        ).scalar(),
+    }
+
+    rollups = [
+        ("rentals", day, "", n)
+        for day, n in db.execute(select(Locations.date, func.count()).group_by(Locations.date))
+    ]
+    returned_on = func.date(Locations.fin, type_=Date)
+    rollups += [
+        ("returns", day, "", n)
+        for day, n in db.execute(
+            select(returned_on, func.count()).where(Locations.fin.is_not(None)).group_by(returned_on)
+        )
+    ]
+    created_on = func.date(BD.date_creation, type_=Date)
+    rollups += [
+        ("new_bds", day, "", n)
+        for day, n in db.execute(
+            select(created_on, func.count()).where(BD.date_creation.is_not(None)).group_by(created_on)
+        )
+    ]
+    # creation_date exists in the production schema but is not mapped
+    if "creation_date" in member_columns:
+        joined_on = func.date(literal_column("creation_date"), type_=Date)
+        rollups += [
+            ("new_members", day, "", n)
+            for day, n in db.execute(
+                select(joined_on, func.count()).select_from(Membres).group_by(joined_on)
+            )
+        ]
+    rollups += [
+        ("series_rentals", day, serie or "", n)
+        for day, serie, n in db.execute(
+            select(Locations.date, BD.titreserie, func.count())
+            .join(BD, Locations.bid == BD.bid)
+            .group_by(Locations.date, BD.titreserie)
+        )
+    ]
+
+    db.execute(delete(counters_table))
+    db.execute(delete(rollup_table))
+    db.execute(counters_table.insert(), [{"name": name, "value": value} for name, value in totals.items()])
+    # NULL and empty series share the "" dimension, add them up
+    merged: Dict[Tuple[str, date, str], int] = {}
+    for metric, day, dimension, n in rollups:
+        if day is not None:
+            merged[(metric, day, dimension)] = merged.get((metric, day, dimension), 0) + n
+    rows = [
+        {"metric": metric, "day": day, "dimension": dimension, "value": n}
+        for (metric, day, dimension), n in merged.items()
+    ]
+    if rows:
+        db.execute(rollup_table.insert(), rows)
+    # Older databases get the column from a later migration, which counts them itself
+    if "nb_locations" in member_columns:
+        recount_member_rentals(db)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Load test of the public catalogue endpoints against a running server.
+
+Start the server on a database holding a restored snapshot, once per mode
+to compare, then run the test against it:
+
+    DB_PROFILE=production uvicorn app.main:app --port 8001
+    DB_PROFILE=production DB_ASYNC=true uvicorn app.main:app --port 8001
+    python -m bench.load_test --base-url http://localhost:8001 --concurrency 50 --duration 20
+
+Every worker loops over a mix of catalogue pages, searches (with varying
+offsets, so that most miss the response cache) and single BDs, and the
+latency percentiles are reported per kind of request and overall.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+TERMS = ["vasco", "lucky", "goscinny", "dupuis", "michel", "spirou", "tintin", "blake", "thorgal", "largo"]
+
+
+def next_request(rng: random.Random, max_bid: int):
+    kind = rng.choice(("page", "search", "bd"))
+    if kind == "page":
+        return kind, f"/bds/?limit=20&skip={rng.randrange(0, 2000, 20)}"
+    if kind == "search":
+        return kind, f"/bds/?limit=20&search={rng.choice(TERMS)}&skip={rng.randrange(0, 40)}"
+    return kind, f"/bds/{rng.randint(1, max_bid)}"
+
+
+async def worker(client: httpx.AsyncClient, seed: int, max_bid: int, deadline: float, latencies, errors):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        kind, url = next_request(rng, max_bid)
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            ok = response.status_code in (200, 404)
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies[kind].append(time.perf_counter() - started)
+        else:
+            errors[kind] += 1
+
+
+def percentile(values, fraction: float) -> float:
+    return sorted(values)[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+async def run(args):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            worker(client, seed, args.max_bid, deadline, latencies, errors)
+            for seed in range(args.concurrency)
+        ))
+
+    everything = [value for values in latencies.values() for value in values]
+    print(f"{len(everything) / args.duration:.0f} requests/s with {args.concurrency} clients over {args.duration}s")
+    print(f"{'':8} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for kind, values in sorted(latencies.items()) + [("all", everything)]:
+        if values:
+            print(
+                f"{kind:8} {len(values):7} {statistics.median(values) * 1000:8.1f} "
+                f"{percentile(values, 0.95):8.1f} {percentile(values, 0.99):8.1f} {max(values) * 1000:8.1f} "
+                f"{sum(errors.values()) if kind == 'all' else errors[kind]:7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the public catalogue endpoints.")
+    parser.add_argument("--base-url", default="http://localhost:8001", help="server to test")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    parser.add_argument("--max-bid", type=int, default=5000, help="highest bid requested by /bds/{bid}")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark of password verification: the request threadpool against the
+dedicated process pool, and a brute-force burst against the login throttle.
+
+Run from ``backend``:
+
+    python -m bench.passwords --logins 40
+
+The first part verifies ``--logins`` bcrypt hashes at once, either in the
+threadpool that also runs the sync handlers (as before) or through
+``verify_password_async``. Meanwhile a probe submits a no-op to the
+threadpool every 10 ms; its latency is what any other request would wait
+for a thread. Calls shed by the pool's queue limit are counted, not timed.
+
+The second part sends ``--attempts`` wrong passwords for one user from one
+client to ``/auth/login``, against a throwaway SQLite database, and counts
+how many of them reached bcrypt.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+PASSWORD = "correct horse battery staple"
+
+
+async def probe(latencies: list, done: asyncio.Event):
+    from starlette.concurrency import run_in_threadpool
+
+    while not done.is_set():
+        started = time.perf_counter()
+        await run_in_threadpool(lambda: None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def verify_burst(verify, logins: int) -> tuple:
+    """Run ``logins`` verifications at once; return (seconds, verified, shed, probe latencies)."""
+    from app.auth import PasswordPoolBusy
+
+    latencies = []
+    done = asyncio.Event()
+    prober = asyncio.create_task(probe(latencies, done))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify() for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    shed = sum(isinstance(result, PasswordPoolBusy) for result in results)
+    verified = sum(result is True for result in results)
+    return elapsed, verified, shed, latencies
+
+
+def report(label: str, elapsed: float, verified: int, shed: int, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    print(
+        f"{label:12} {verified:4} verified {shed:4} shed {verified / elapsed:7.1f} logins/s   "
+        f"threadpool wait p50 {statistics.median(latencies or [0]):7.1f} ms p99 {p99:7.1f} ms"
+    )
+
+
+async def pool_benchmark(logins: int):
+    from starlette.concurrency import run_in_threadpool
+    from app import auth
+
+    hashed = auth.get_password_hash(PASSWORD)
+    # Start the workers before timing
+    await auth.verify_password_async(PASSWORD, hashed)
+
+    report("threadpool", *await verify_burst(
+        lambda: run_in_threadpool(auth.verify_password, PASSWORD, hashed), logins
+    ))
+    report("process pool", *await verify_burst(
+        lambda: auth.verify_password_async(PASSWORD, hashed), logins
+    ))
+    print(f"(pool: {auth.PASSWORD_WORKERS} workers, queue limit {auth.PASSWORD_QUEUE_LIMIT}, {os.cpu_count()} CPUs)")
+
+
+async def throttle_benchmark(attempts: int):
+    import httpx
+    from app import auth, models, routes
+    from app.database import SessionLocal, get_engine
+    from app.main import app
+
+    models.Base.metadata.create_all(bind=get_engine())
+    with SessionLocal() as db:
+        db.add(models.User(
+            username="admin", email="admin@example.com", hashed_password=auth.get_password_hash(PASSWORD),
+            is_active=True, is_admin=True
+        ))
+        db.commit()
+
+    verifications = 0
+    verify = auth.verify_password_async
+
+    async def counting_verify(*args):
+        nonlocal verifications
+        verifications += 1
+        return await verify(*args)
+
+    routes.verify_password_async = counting_verify
+
+    statuses = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for i in range(attempts):
+            response = await client.post("/auth/login", json={"username": "admin", "password": f"guess{i}"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+    print(
+        f"{attempts} wrong passwords in {elapsed:.2f} s: "
+        + ", ".join(f"{count} x {code}" for code, count in sorted(statuses.items()))
+        + f"; {verifications} reached bcrypt"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password verification and the login throttle.")
+    parser.add_argument("--logins", type=int, default=40, help="concurrent verifications")
+    parser.add_argument("--attempts", type=int, default=200, help="brute-force login attempts")
+    args = parser.parse_args()
+
+    # The app reads its database settings at import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["DB_ECHO"] = "false"
+
+    from app.auth import shutdown_password_pool
+
+    try:
+        asyncio.run(pool_benchmark(args.logins))
+        asyncio.run(throttle_benchmark(args.attempts))
+    finally:
+        shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the catalogue search: the old ILIKE scan against the trigram index.
+
+Run from ``backend`` against a database holding a restored snapshot:
+
+    python load_dump.py sqlDumps/dump-bookdb-202602152230.sql --database-url sqlite:///bench.sqlite
+    python -m bench.search --database-url sqlite:///bench.sqlite
+
+For each term it prints the matches and the time per search of the ILIKE
+filter over the searchable columns and of ``SearchIndex.search``; terms
+shorter than a trigram are answered by the ILIKE filter in the app, shown
+as "sql". It then measures how long searches take while the index is being
+rebuilt in another thread.
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import create_db_engine
+from app.search import SEARCH_FIELDS, SearchIndex
+
+TERMS = ["a", "as", "vas", "vasco", "lucky", "goscinny", "dupuis", "michel vaillant", "zzz"]
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalogue search.")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="database with a restored snapshot (default: DATABASE_URL)")
+    parser.add_argument("--repeat", type=int, default=20, help="searches timed per term")
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url, echo=False)
+    with Session(engine) as db:
+        print(f"{db.query(models.BD).count()} BDs")
+        index = SearchIndex()
+        build_ms = per_call_ms(lambda: index.load(db), 3)
+        print(f"Index build: {build_ms:.1f} ms")
+
+        print(f"{'term':18} {'ILIKE':>16} {'index':>18}")
+        for term in TERMS:
+            search_term = f"%{term}%"
+            ilike = db.query(models.BD.bid).filter(
+                or_(*[getattr(models.BD, field).ilike(search_term) for field in SEARCH_FIELDS])
+            )
+            matches = len(ilike.all())
+            ilike_ms = per_call_ms(lambda: ilike.all(), args.repeat)
+            found = index.search(db, term)
+            if found is None:
+                indexed = "sql"
+            else:
+                indexed = f"{len(found):5} {per_call_ms(lambda: index.search(db, term), args.repeat):8.3f} ms"
+            print(f"{term!r:18} {matches:5} {ilike_ms:7.2f} ms {indexed:>18}")
+
+        # Searches while another thread rebuilds the index over and over
+        done = threading.Event()
+
+        def rebuild():
+            with Session(engine) as other:
+                while not done.is_set():
+                    index.load(other)
+
+        rebuilder = threading.Thread(target=rebuild)
+        rebuilder.start()
+        latencies = []
+        try:
+            for _ in range(200):
+                started = time.perf_counter()
+                index.search(db, "vasco")
+                latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.001)
+        finally:
+            done.set()
+            rebuilder.join()
+        print(
+            f"During rebuilds: median {statistics.median(latencies):.3f} ms, "
+            f"max {max(latencies):.1f} ms per search (a rebuild takes {build_ms:.1f} ms)"
+        )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the catalogue list serialization: FastAPI's default response
+against the column projection with ``FastJSONResponse``.
+
+Run from ``backend`` against a database holding a restored snapshot:
+
+    python load_dump.py sqlDumps/dump-bookdb-202602152230.sql --database-url sqlite:///bench.sqlite
+    python -m bench.serialization --database-url sqlite:///bench.sqlite
+
+For each page size it times, per page:
+
+- "default": loading ORM objects, then what FastAPI does with a
+  ``response_model``: validating them into ``list[BDBase]``, running
+  ``jsonable_encoder`` and ``JSONResponse.render``;
+- "json": loading the projected columns as dicts and encoding them with
+  the standard library, the fallback of ``responses.dumps``;
+- "orjson": the same dicts encoded with orjson.
+
+Every variant must produce the same JSON document.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, responses, schemas
+from app.database import create_db_engine
+from app.routes import BD_LIST_COLUMNS, BD_LIST_FIELDS
+
+PAGE_SIZES = [20, 100, 1000]
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalogue list serialization.")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="database with a restored snapshot (default: DATABASE_URL)")
+    parser.add_argument("--repeat", type=int, default=20, help="pages timed per variant")
+    args = parser.parse_args()
+
+    if responses.orjson is None:
+        parser.error("orjson is not installed")
+    adapter = TypeAdapter(list[schemas.BDBase])
+    engine = create_db_engine(args.database_url, echo=False)
+    with Session(engine) as db:
+        print(f"{'page':>6} {'default':>12} {'json':>12} {'orjson':>12}")
+        for size in PAGE_SIZES:
+            def default():
+                bds = db.query(models.BD).order_by(models.BD.bid).limit(size).all()
+                content = jsonable_encoder(adapter.validate_python(bds, from_attributes=True))
+                return JSONResponse(content).body
+
+            def projected():
+                rows = db.execute(select(*BD_LIST_COLUMNS).order_by(models.BD.bid).limit(size))
+                return [dict(zip(BD_LIST_FIELDS, row)) for row in rows]
+
+            def stdlib():
+                orjson, responses.orjson = responses.orjson, None
+                try:
+                    return responses.dumps(projected())
+                finally:
+                    responses.orjson = orjson
+
+            def fast():
+                return responses.dumps(projected())
+
+            assert json.loads(default()) == json.loads(stdlib()) == json.loads(fast())
+            timings = [per_call_ms(variant, args.repeat) for variant in (default, stdlib, fast)]
+            db.expunge_all()
+            print(f"{size:6} " + " ".join(f"{ms:9.2f} ms" for ms in timings))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 """
 Database initialization script for BD Library
-This script creates all tables and can optionally create an admin user.
+This script creates all tables, applies the pending migrations and can
+optionally create an admin user. The app no longer does any of this when
+it starts, so run it once per deployment, before the workers:
+
+    python init_db.py                 # asks whether to create an admin
+    python init_db.py --no-admin      # schema only, never prompts
+    python init_db.py --admin         # admin from ADMIN_USERNAME, ADMIN_EMAIL and ADMIN_PASSWORD
 """
 
+import argparse
 import sys
 import os
 from getpass import getpass
@@ -11,21 +18,34 @@ from getpass import getpass
 # Add the app directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
-from app.database import engine, SessionLocal
+from app.database import get_engine, SessionLocal
 from app import models
+from app.migrations import run_migrations
 from app.auth import get_password_hash
 from datetime import datetime
 
 def create_tables():
     """Create all database tables."""
     print("Creating database tables...")
+    engine = get_engine()
     models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("✓ Database tables created successfully!")
 
-def create_admin_user():
-    """Create an admin user interactively."""
+def create_admin_user(username=None, email=None, password=None):
+    """Create an admin user, prompting for the details that are not given."""
     db = SessionLocal()
     try:
+        if username is not None:
+            if db.query(models.User).filter(models.User.username == username).first():
+                print(f"✓ Admin user '{username}' already exists, skipping.")
+                return
+            if not email or not password:
+                print("❌ ADMIN_EMAIL and ADMIN_PASSWORD must be set too.")
+                return
+            save_admin_user(db, username, email, password)
+            return
+
         # # Check if any users exist
         # existing_users = db.query(models.User).count()
         # if existing_users > 0:
@@ -53,20 +73,7 @@ def create_admin_user():
             print("❌ Passwords do not match.")
             return
 
-        # Create admin user
-        hashed_password = get_password_hash(password)
-        admin_user = models.User(
-            username=username,
-            email=email,
-            hashed_password=hashed_password,
-            is_active=True,
-            is_admin=True,
-            created_at=datetime.utcnow()
-        )
-
-        db.add(admin_user)
-        db.commit()
-        print(f"✓ Admin user '{username}' created successfully!")
+        save_admin_user(db, username, email, password)
 
     except Exception as e:
         db.rollback()
@@ -74,16 +81,45 @@ def create_admin_user():
     finally:
         db.close()
 
+def save_admin_user(db, username, email, password):
+    hashed_password = get_password_hash(password)
+    admin_user = models.User(
+        username=username,
+        email=email,
+        hashed_password=hashed_password,
+        is_active=True,
+        is_admin=True,
+        created_at=datetime.utcnow()
+    )
+
+    db.add(admin_user)
+    db.commit()
+    print(f"✓ Admin user '{username}' created successfully!")
+
 def main():
+    parser = argparse.ArgumentParser(description="Create the BD Library tables and apply the migrations.")
+    admin = parser.add_mutually_exclusive_group()
+    admin.add_argument("--no-admin", action="store_true", help="do not create an admin user, never prompt")
+    admin.add_argument("--admin", action="store_true",
+                       help="create an admin user from ADMIN_USERNAME, ADMIN_EMAIL and ADMIN_PASSWORD")
+    args = parser.parse_args()
+
     print("BD Library Database Initialization")
     print("=" * 40)
     
     try:
         create_tables()
         
-        create_user = input("\nWould you like to create an admin user? (y/N): ").strip().lower()
-        if create_user in ['y', 'yes']:
-            create_admin_user()
+        if args.admin:
+            username = os.environ.get("ADMIN_USERNAME", "").strip()
+            if not username:
+                print("❌ ADMIN_USERNAME is not set.")
+                sys.exit(1)
+            create_admin_user(username, os.environ.get("ADMIN_EMAIL", "").strip(), os.environ.get("ADMIN_PASSWORD", ""))
+        elif not args.no_admin and sys.stdin.isatty():
+            create_user = input("\nWould you like to create an admin user? (y/N): ").strip().lower()
+            if create_user in ['y', 'yes']:
+                create_admin_user()
         
         print("\n✓ Database initialization completed!")
         print("\nYou can now start the server with:")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Fast loader for the mysqldump snapshots in sqlDumps/.
+
+Restoring a snapshot through the MySQL entrypoint replays the dump
+statement by statement and keeps whatever encoding damage the dump carries.
+This script instead streams the dump line by line, parses the
+``INSERT ... VALUES`` tuples incrementally (the file is never read into
+memory), repairs the text and bulk-loads the rows through SQLAlchemy into
+any database, SQLite included:
+
+    python load_dump.py sqlDumps/dump-bookdb-202506172110.sql
+    python load_dump.py sqlDumps/dump-bookdb-202506172110.sql --database-url sqlite:///bookdb.sqlite
+
+Rows are loaded into the tables of the models: the tables of the dump
+that the models do not know (``bdpass``) are skipped, and so are their
+extra columns. Every loaded table is emptied first, then everything is
+loaded in a single transaction and the statistics are rebuilt.
+
+Text repair
+-----------
+Depending on the snapshot, accented letters were stored once, twice or
+three times encoded as UTF-8 and read back as latin1 ("é" became "Ã©",
+then "Ã\\x83Â©"), some lost bytes were written as "?" ("Ã?Â©") or
+dropped ("ÃÂ©"), and some were lowercased ("ã©"). Each run of non-ASCII
+characters is encoded back to cp1252/latin1 and decoded as UTF-8 for as
+long as that succeeds. Text that was right to begin with never decodes
+and is kept as is. Lines that are not valid UTF-8 are read as latin1.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+from datetime import date, datetime
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, delete, text
+
+from app import models, stats
+from app.database import create_db_engine
+from app.migrations import run_migrations
+
+BATCH_ROWS = 1000
+
+CREATE_TABLE = re.compile(r"CREATE TABLE `([^`]+)`")
+COLUMN_DEF = re.compile(r"\s*`([^`]+)`\s+(\w+)")
+INSERT = re.compile(r"(?:INSERT|REPLACE)(?:\s+IGNORE)?\s+INTO\s+`([^`]+)`\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.I)
+
+# One token of a VALUES list: a quoted string, NULL, any other literal, or punctuation
+TOKEN = re.compile(r"\s*(?:'((?:[^'\\]|\\.|'')*)'|(NULL)\b|([^\s,()';]+)|([(),;]))", re.S)
+
+ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+ESCAPE = re.compile(r"\\(.)|''", re.S)
+
+# MySQL's zero dates, which only mean "no date"
+ZERO_DATES = ("0000-00-00", "0000-00-00 00:00:00")
+
+# Columns computed from the rest of the loaded row: the sort key the dumps
+# never contain, and the start of the few old rentals that have a zero one
+# (set to their end, as the later snapshots did)
+DERIVED_COLUMNS = {
+    "bd": {"numtome_sort": lambda row: models.tome_sort_key(row.get("numtome"))},
+    "locations": {"debut": lambda row: row.get("debut") or row.get("fin") or datetime.combine(row["date"], datetime.min.time())},
+}
+
+# The bytes 0x80-0xBF (UTF-8 continuation bytes) as they read in cp1252
+_CONTINUATION = "".join(
+    bytes([byte]).decode("cp1252", errors="ignore") or chr(byte)
+    for byte in range(0x80, 0xC0)
+)
+# A double encoded "Ã" is "Ã" + "\x83"; the "\x83" was written as "?" or dropped
+_LOST_BYTE = re.compile("Ã\\??(?=[Ââ])")
+# "Ã" lowercased to "ã" in front of a continuation byte
+_LOWERED = re.compile("ã(?=[" + re.escape(_CONTINUATION) + "])")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def _mojibake_bytes(run: str):
+    """The bytes that ``run`` was decoded from as cp1252 (or latin1), None if it cannot be."""
+    try:
+        return run.encode("cp1252")
+    except UnicodeEncodeError:
+        pass
+    raw = bytearray()
+    for char in run:
+        try:
+            raw += char.encode("cp1252")
+        except UnicodeEncodeError:
+            if ord(char) > 0xFF:
+                return None
+            raw.append(ord(char))
+    return bytes(raw)
+
+
+def _fix_run(match) -> str:
+    run = match.group(0)
+    raw = _mojibake_bytes(run)
+    if raw is None:
+        return run
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return run
+
+
+def fix_text(value: str) -> str:
+    """Undo up to three levels of UTF-8 read back as latin1."""
+    if value.isascii():
+        return value
+    for _ in range(3):
+        fixed = _LOWERED.sub("Ã", _LOST_BYTE.sub("Ã\x83", value))
+        fixed = _NON_ASCII.sub(_fix_run, fixed)
+        if fixed == value:
+            break
+        value = fixed
+    return value
+
+
+def transliterate(value: str) -> str:
+    """Strip accents, for targets that only accept ASCII."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).encode("ascii", "replace").decode()
+
+
+def _unescape(value: str) -> str:
+    if "\\" not in value and "''" not in value:
+        return value
+    return ESCAPE.sub(lambda m: "'" if m.group(1) is None else ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+class ValuesParser:
+    """Incremental parser of the tuples of one ``INSERT ... VALUES`` statement.
+
+    ``feed`` takes the statement a line at a time and returns the rows it
+    completed, as lists of strings (None for NULL); a string cut by the end
+    of a chunk is carried over to the next one. ``done`` is set once the
+    terminating semicolon has been read.
+    """
+
+    def __init__(self):
+        self.pending = ""
+        self.row = None
+        self.done = False
+
+    def feed(self, chunk: str) -> list:
+        data = self.pending + chunk
+        rows = []
+        pos, end = 0, len(data)
+        while pos < end:
+            match = TOKEN.match(data, pos)
+            if match is None:
+                break
+            pos = match.end()
+            string, null, literal, punct = match.groups()
+            if punct == "(":
+                self.row = []
+            elif punct == ")":
+                rows.append(self.row)
+                self.row = None
+            elif punct == ";":
+                self.done = True
+                self.pending = ""
+                return rows
+            elif punct is None and self.row is not None:
+                if string is not None:
+                    self.row.append(_unescape(string))
+                else:
+                    self.row.append(None if null else literal)
+        self.pending = data[pos:] if data[pos:].strip() else ""
+        return rows
+
+
+def read_lines(path: str, encoding: str):
+    """Decode the dump a line at a time, falling back to latin1 if ``encoding`` is "auto"."""
+    with open(path, "rb") as dump:
+        for raw in dump:
+            if encoding != "auto":
+                yield raw.decode(encoding)
+                continue
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError:
+                yield raw.decode("latin-1")
+
+
+class TableLoader:
+    """Converts the rows of one dumped table to its model's columns and inserts them in batches."""
+
+    def __init__(self, loader, table, dump_columns: dict, column_names: list):
+        self.loader = loader
+        self.table = table
+        self.rows = 0
+        self.seconds = 0.0
+        self.batch = []
+        self.derived = DERIVED_COLUMNS.get(table.name, {})
+        # (position in the dump row, column name, converter)
+        self.fields = []
+        for position, name in enumerate(column_names):
+            # Generated columns are computed by the database
+            if name in table.c and table.c[name].computed is None:
+                self.fields.append((position, name, self._converter(table.c[name], dump_columns.get(name))))
+
+    def _converter(self, column, dump_type):
+        if isinstance(column.type, Integer):
+            if dump_type and dump_type.lower() in ("varchar", "char", "text"):
+                # Legacy snapshots keyed BDs by ISBN; number them in dump order
+                # and translate the references to them
+                return self.loader.key_converter(column)
+            return lambda value: int(value) if value not in (None, "") else None
+        if isinstance(column.type, Boolean):
+            return lambda value: bool(int(value)) if value not in (None, "") else None
+        if isinstance(column.type, DateTime):
+            return lambda value: None if value in (None, "") or value in ZERO_DATES else datetime.fromisoformat(value)
+        if isinstance(column.type, Date):
+            return lambda value: None if value in (None, "") or value in ZERO_DATES else date.fromisoformat(value[:10])
+        return self.loader.text_converter
+
+    def add(self, dump_row: list):
+        row = {name: convert(dump_row[position]) for position, name, convert in self.fields}
+        for name, compute in self.derived.items():
+            row[name] = compute(row)
+        self.batch.append(row)
+        if len(self.batch) >= self.loader.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.loader.conn.execute(self.table.insert(), self.batch)
+            self.rows += len(self.batch)
+            self.batch = []
+
+
+class DumpLoader:
+    def __init__(self, conn, batch_rows: int = BATCH_ROWS, fix: bool = True, ascii_only: bool = False):
+        self.conn = conn
+        self.batch_rows = batch_rows
+        self.fix = fix
+        self.ascii_only = ascii_only
+        self.tables = {}
+        self.skipped = set()
+        self.fixed_values = 0
+        # Legacy key remapping, per referenced column
+        self.keys = {}
+
+    def text_converter(self, value):
+        if value is None:
+            return None
+        if self.fix:
+            fixed = fix_text(value)
+            if fixed != value:
+                self.fixed_values += 1
+                value = fixed
+        if self.ascii_only and not value.isascii():
+            value = transliterate(value)
+        return value
+
+    def key_converter(self, column):
+        if column.foreign_keys:
+            target = next(iter(column.foreign_keys)).column
+            mapping = self.keys.setdefault((target.table.name, target.name), {})
+            return lambda value: mapping.get(value)
+        mapping = self.keys.setdefault((column.table.name, column.name), {})
+
+        def assign(value):
+            mapping[value] = len(mapping) + 1
+            return mapping[value]
+        return assign
+
+    def table_loader(self, name: str, dump_columns: dict, column_names: list):
+        table = models.Base.metadata.tables.get(name)
+        if table is None:
+            self.skipped.add(name)
+            return None
+        if name not in self.tables:
+            # Restoring a snapshot replaces the table's content
+            self.conn.execute(delete(table))
+            self.tables[name] = TableLoader(self, table, dump_columns, column_names)
+        return self.tables[name]
+
+    def load(self, lines):
+        dump_columns = {}
+        current_table = None
+        parser = loader = None
+        for line in lines:
+            if parser is not None:
+                started = time.perf_counter()
+                rows = parser.feed(line)
+                if loader is not None:
+                    for row in rows:
+                        loader.add(row)
+                    loader.seconds += time.perf_counter() - started
+                if parser.done:
+                    parser = loader = None
+                continue
+
+            match = CREATE_TABLE.match(line)
+            if match:
+                current_table = match.group(1)
+                dump_columns[current_table] = {}
+                continue
+            if current_table is not None:
+                if line.startswith(")"):
+                    current_table = None
+                else:
+                    column = COLUMN_DEF.match(line)
+                    if column:
+                        dump_columns[current_table][column.group(1)] = column.group(2)
+                continue
+
+            match = INSERT.match(line)
+            if match:
+                name, listed = match.groups()
+                columns = dump_columns.get(name, {})
+                names = [c.strip(" `") for c in listed.split(",")] if listed else list(columns)
+                loader = self.table_loader(name, columns, names)
+                parser = ValuesParser()
+                started = time.perf_counter()
+                rows = parser.feed(line[match.end():])
+                if loader is not None:
+                    for row in rows:
+                        loader.add(row)
+                    loader.seconds += time.perf_counter() - started
+                if parser.done:
+                    parser = loader = None
+
+        for loader in self.tables.values():
+            started = time.perf_counter()
+            loader.flush()
+            loader.seconds += time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a mysqldump snapshot into the configured database.")
+    parser.add_argument("dump", help="path of the .sql dump")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="target database (default: DATABASE_URL)")
+    parser.add_argument("--encoding", default="auto",
+                        help="encoding of the dump, 'auto' reads UTF-8 and falls back to latin1 (default: auto)")
+    parser.add_argument("--no-fix-text", action="store_true", help="load the text exactly as dumped")
+    parser.add_argument("--ascii", action="store_true", help="transliterate the text to plain ASCII")
+    parser.add_argument("--batch-size", type=int, default=BATCH_ROWS, help="rows per INSERT batch")
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url, echo=False)
+    size = os.path.getsize(args.dump)
+    print(f"Loading {args.dump} ({size / 1e6:.1f} MB) into {engine.url.render_as_string()}")
+    started = time.perf_counter()
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        with engine.begin() as conn:
+            if conn.dialect.name == "mysql":
+                conn.execute(text("SET FOREIGN_KEY_CHECKS = 0, UNIQUE_CHECKS = 0"))
+            loader = DumpLoader(conn, args.batch_size, fix=not args.no_fix_text, ascii_only=args.ascii)
+            loader.load(read_lines(args.dump, args.encoding))
+            stats.rebuild(conn)
+            if conn.dialect.name == "mysql":
+                conn.execute(text("SET FOREIGN_KEY_CHECKS = 1, UNIQUE_CHECKS = 1"))
+    except Exception as e:
+        print(f"❌ Loading failed: {e}")
+        sys.exit(1)
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+
+    total = 0
+    for name, table in loader.tables.items():
+        rate = table.rows / table.seconds if table.seconds else 0
+        print(f"  {name:<12} {table.rows:>7} rows  {table.seconds:6.2f}s  {rate:>9.0f} rows/s")
+        total += table.rows
+    for name in sorted(loader.skipped):
+        print(f"  {name:<12} skipped, not a table of the models")
+    if loader.fixed_values:
+        print(f"Repaired the encoding of {loader.fixed_values} values")
+    print(f"✓ Loaded {total} rows in {elapsed:.2f}s ({total / elapsed:.0f} rows/s, {size / 1e6 / elapsed:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
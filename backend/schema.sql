@@ -16,10 +16,38 @@ create table bd
     titre_norm        varchar(255)                        null,
     serie_norm        varchar(255)                        null,
     ISBN              int                                 null,
+    numtome_sort      int         default -2147483648     not null,
     constraint cote
         unique (cote)
 );
 
+create index ix_bd_default_order
+    on bd ((titreserie = ''), titreserie, numtome_sort, bid);
+
+create index ix_bd_numtome_sort
+    on bd (numtome_sort, bid);
+
+create index ix_bd_sort_cote
+    on bd ((cote = ''), cote, bid);
+
+create index ix_bd_sort_titrealbum
+    on bd ((titrealbum is null), (coalesce(titrealbum, '') = ''), (coalesce(titrealbum, '')), bid);
+
+create index ix_bd_sort_scenariste
+    on bd ((scenariste = ''), scenariste, bid);
+
+create index ix_bd_sort_dessinateur
+    on bd ((dessinateur = ''), dessinateur, bid);
+
+create index ix_bd_sort_collection
+    on bd ((collection is null), (coalesce(collection, '') = ''), (coalesce(collection, '')), bid);
+
+create index ix_bd_sort_editeur
+    on bd ((editeur is null), (coalesce(editeur, '') = ''), (coalesce(editeur, '')), bid);
+
+create index ix_bd_sort_genre
+    on bd ((genre is null), (coalesce(genre, '') = ''), (coalesce(genre, '')), bid);
+
 create table membres
 (
     mid           int auto_increment
@@ -41,6 +69,7 @@ create table membres
     IBAN          int                                   null,
     groupe        varchar(255)                          null,
     creation_date timestamp   default CURRENT_TIMESTAMP not null,
+    nb_locations  int         default 0                 not null,
     constraint nom
         unique (nom, prenom)
 )
@@ -58,6 +87,7 @@ create table locations
     mail_rappel_2_envoye tinyint(1) default 0                 not null,
     debut                timestamp  default CURRENT_TIMESTAMP not null,
     fin                  timestamp                            null,
+    open_bid             int as (case when fin is null then bid end),
     constraint fk_bid
         foreign key (bid) references bd (bid),
     constraint fk_mid
@@ -68,6 +98,21 @@ create table locations
 create index mid
     on locations (mid);
 
+create index ix_locations_mid_debut
+    on locations (mid, debut desc, lid);
+
+create index ix_locations_fin_date
+    on locations (fin, date);
+
+create index ix_locations_bid_fin
+    on locations (bid, fin);
+
+create index ix_locations_mid_fin
+    on locations (mid, fin);
+
+create unique index ux_locations_open_bid
+    on locations (open_bid);
+
 create table users
 (
     id              int auto_increment
@@ -84,3 +129,19 @@ create table users
         unique (username)
 );
 
+
+create table stats_counters
+(
+    name  varchar(50) not null
+        primary key,
+    value int         not null
+);
+
+create table stats_rollup
+(
+    metric    varchar(50)  not null,
+    day       date         not null,
+    dimension varchar(255) not null,
+    value     int          not null,
+    primary key (metric, day, dimension)
+);
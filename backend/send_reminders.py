@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Mail the members whose rentals are overdue, see app/reminders.py.
+
+Meant to run once a day from cron (or any scheduler); running it again
+the same day sends nothing new:
+
+    python send_reminders.py                   # through SMTP_HOST:SMTP_PORT
+    python send_reminders.py --backend file    # .eml files in MAIL_FILE_DIR
+    python send_reminders.py --dry-run         # list who would be reminded
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from app.database import SessionLocal
+from app.reminders import BACKENDS, CHUNK_ROWS, get_backend, send_reminders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the overdue rental reminders.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="mail backend (default: MAIL_BACKEND or smtp)")
+    parser.add_argument("--dry-run", action="store_true", help="print the reminders instead of sending them")
+    parser.add_argument("--date", type=date.fromisoformat, help="run as if today were this date (YYYY-MM-DD)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS, help="rentals handled per batch")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        try:
+            report = send_reminders(db, get_backend(args.backend), args.date, args.dry_run, args.chunk_size)
+        except Exception as e:
+            print(f"❌ Sending reminders failed: {e}")
+            sys.exit(1)
+
+    for error in report["errors"]:
+        print(f"❌ {error}")
+    print(
+        f"✓ {report['members']} members with overdue rentals: {report['mails_sent']} mails sent, "
+        f"{report['rentals_flagged']} rentals flagged, {report['no_address']} without an address, "
+        f"{report['failed']} failed"
+    )
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
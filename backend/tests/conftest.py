@@ -0,0 +1,142 @@
+"""
+Shared fixtures: the app running against a throwaway SQLite database.
+
+The database is created once per session with ``create_all`` and the
+migrations, like ``init_db.py`` does, and emptied after every test. Tests
+call ``seed`` for the rows they need; it also reloads the in-process
+indexes and statistics, so every test starts from the same state.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Must be set before the app is imported, the engine settings are read at import
+_DB_DIR = tempfile.mkdtemp(prefix="kotbd-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["DB_ECHO"] = "false"
+os.environ.pop("DB_ASYNC", None)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app import database, models, stats
+from app.availability import availability_index
+from app.main import app
+from app.migrations import run_migrations
+from app.routes import count_cache, get_current_user, response_cache
+from app.search import search_index
+
+ADMIN = SimpleNamespace(
+    id=1, username="admin", email="admin@example.com", is_active=True, is_admin=True, created_at=None
+)
+
+SERIES = ("Astérix", "Lucky Luke", "Vasco", "")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    db_engine = database.get_engine()
+    models.Base.metadata.create_all(bind=db_engine)
+    run_migrations(db_engine)
+    return db_engine
+
+
+@pytest.fixture(autouse=True)
+def clean_database(engine):
+    yield
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    response_cache.bump()
+    count_cache.clear()
+
+
+@pytest.fixture
+def db(engine):
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(engine):
+    app.dependency_overrides[get_current_user] = lambda: ADMIN
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def seed(db):
+    """Insert ``bds`` BDs and ``members`` members; every ``rent_every``-th BD is rented out."""
+
+    def insert(bds: int = 60, members: int = 20, rent_every: int = 3, closed_per_member: int = 0):
+        db.add_all(
+            models.Membres(mid=mid, nom=f"Nom{mid:03d}", prenom=f"Prénom{mid}", caution=10)
+            for mid in range(1, members + 1)
+        )
+        db.add_all(
+            models.BD(
+                bid=bid, cote=f"C{bid:05d}", titreserie=SERIES[bid % len(SERIES)],
+                titrealbum=f"Album {bid}", numtome=str(bid % 40), scenariste="Goscinny",
+                dessinateur="Uderzo", date_creation=datetime(2020, 1, 1)
+            )
+            for bid in range(1, bds + 1)
+        )
+        db.flush()
+        started = datetime(2024, 1, 1, 10)
+        for bid in range(1, bds + 1, rent_every):
+            db.add(models.Locations(
+                bid=bid, mid=bid % members + 1, date=started.date(), debut=started + timedelta(hours=bid)
+            ))
+        for mid in range(1, members + 1):
+            for i in range(closed_per_member):
+                debut = started - timedelta(days=i + 1, minutes=mid)
+                db.add(models.Locations(
+                    bid=i % bds + 1, mid=mid, date=debut.date(), debut=debut, fin=debut + timedelta(days=7)
+                ))
+        db.commit()
+        stats.rebuild(db)
+        db.commit()
+        search_index.load(db)
+        availability_index.load(db)
+
+    return insert
+
+
+@pytest.fixture
+def statements(engine):
+    """The SQL statements executed while the test runs; clear it to start counting."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def query_plan(db):
+    """Return SQLite's EXPLAIN QUERY PLAN of a statement, one string per step.
+
+    Statements keep their bound parameters, as when the application runs
+    them: SQLite plans a query differently when a value is inlined.
+    """
+
+    def explain(statement, params=None):
+        if not isinstance(statement, str):
+            compiled = statement.compile(db.get_bind(), compile_kwargs={"render_postcompile": True})
+            values = compiled.construct_params()
+            positional = tuple(values[name] for name in compiled.positiontup)
+            return [row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", positional)]
+        return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {statement}"), params or {})]
+
+    return explain
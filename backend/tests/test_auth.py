@@ -0,0 +1,204 @@
+"""Logins: password checks in the process pool, throttling, and the token and user caches."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import auth, models, routes
+from app.auth import LoginThrottle
+from app.main import app
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def password_pool():
+    yield
+    auth.shutdown_password_pool()
+
+
+@pytest.fixture
+def throttles(monkeypatch):
+    """Fresh login throttles: 5 attempts per client, 3 failures per user."""
+    ip, user = LoginThrottle(limit=5, window=60), LoginThrottle(limit=3, window=300)
+    monkeypatch.setattr(routes, "login_ip_throttle", ip)
+    monkeypatch.setattr(routes, "login_user_throttle", user)
+    return ip, user
+
+
+@pytest.fixture
+def user(db):
+    account = models.User(
+        username="alice", email="alice@example.com", is_active=True, is_admin=True,
+        # Few rounds, the tests check the flow rather than bcrypt's cost
+        hashed_password=auth.pwd_context.hash(PASSWORD, rounds=4)
+    )
+    db.add(account)
+    db.commit()
+    yield account
+    auth.user_cache.clear()
+    auth.token_cache.clear()
+
+
+def login(client, password, username="alice"):
+    return client.post("/auth/login", json={"username": username, "password": password})
+
+
+def test_login_verifies_the_password(client, user, throttles):
+    assert login(client, "wrong").status_code == 401
+
+    response = login(client, PASSWORD)
+
+    assert response.status_code == 200
+    assert response.json()["user"]["username"] == "alice"
+    token = response.json()["access_token"]
+    assert auth.verify_token(token) == {"username": "alice"}
+
+
+def test_failed_logins_are_throttled_per_user(client, user, throttles):
+    for _ in range(3):
+        assert login(client, "wrong").status_code == 401
+
+    response = login(client, PASSWORD)
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 300
+    # Case variants of the username share the limit
+    assert login(client, PASSWORD, "ALICE").status_code == 429
+
+
+def test_logins_are_throttled_per_client(client, user, throttles):
+    for i in range(5):
+        assert login(client, "wrong", f"nobody{i}").status_code == 401
+
+    response = login(client, PASSWORD)
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+
+
+def test_successful_login_resets_the_user_limit(client, user, throttles):
+    ip, _ = throttles
+    ip.limit = 100
+    for _ in range(2):
+        assert login(client, "wrong").status_code == 401
+    assert login(client, PASSWORD).status_code == 200
+
+    for _ in range(2):
+        assert login(client, "wrong").status_code == 401
+    assert login(client, PASSWORD).status_code == 200
+
+
+def test_full_password_pool_sheds_logins(client, user, throttles, monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_QUEUE_LIMIT", 0)
+
+    response = login(client, PASSWORD)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.fixture
+def accounts(db):
+    """An admin, ``root``, and a user, ``bob``, with a token each."""
+    users = {
+        name: models.User(
+            username=name, email=f"{name}@example.com", is_active=True, is_admin=name == "root",
+            hashed_password="unused"
+        )
+        for name in ("root", "bob")
+    }
+    db.add_all(users.values())
+    db.commit()
+    yield {
+        name: (user.id, {"Authorization": f"Bearer {auth.create_access_token({'sub': name})}"})
+        for name, user in users.items()
+    }
+    auth.user_cache.clear()
+    auth.token_cache.clear()
+
+
+@pytest.fixture
+def authenticated_client(engine):
+    # Unlike ``client``, requests go through the real get_current_user
+    return TestClient(app)
+
+
+def test_user_changes_apply_once_the_cache_is_invalidated(authenticated_client, accounts, db):
+    _, bob = accounts["bob"]
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 200
+    assert auth.user_cache.get("bob") is not None
+
+    # Written behind the API's back, e.g. by another worker
+    db.query(models.User).filter(models.User.username == "bob").update({"is_active": False})
+    db.commit()
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 200
+
+    auth.user_cache.pop("bob")
+    response = authenticated_client.get("/auth/me", headers=bob)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Inactive user"
+
+    db.query(models.User).filter(models.User.username == "bob").delete()
+    db.commit()
+    auth.user_cache.pop("bob")
+    response = authenticated_client.get("/auth/me", headers=bob)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+
+def test_deactivating_a_user_invalidates_the_cache(authenticated_client, accounts):
+    bob_id, bob = accounts["bob"]
+    _, root = accounts["root"]
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 200
+
+    response = authenticated_client.put(f"/admin/users/{bob_id}", json={"is_active": False}, headers=root)
+
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    assert auth.user_cache.get("bob") is None
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 401
+
+    authenticated_client.put(f"/admin/users/{bob_id}", json={"is_active": True}, headers=root)
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 200
+
+
+def test_granting_admin_rights_invalidates_the_cache(authenticated_client, accounts):
+    bob_id, bob = accounts["bob"]
+    _, root = accounts["root"]
+    assert authenticated_client.get("/admin/cache-stats", headers=bob).status_code == 403
+
+    authenticated_client.put(f"/admin/users/{bob_id}", json={"is_admin": True}, headers=root)
+
+    assert authenticated_client.get("/admin/cache-stats", headers=bob).status_code == 200
+
+
+def test_deleting_a_user_invalidates_the_cache(authenticated_client, accounts):
+    bob_id, bob = accounts["bob"]
+    _, root = accounts["root"]
+    assert authenticated_client.get("/auth/me", headers=bob).status_code == 200
+
+    assert authenticated_client.delete(f"/admin/users/{bob_id}", headers=root).status_code == 200
+
+    assert auth.user_cache.get("bob") is None
+    response = authenticated_client.get("/auth/me", headers=bob)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+    assert authenticated_client.delete(f"/admin/users/{bob_id}", headers=root).status_code == 404
+
+
+def test_only_admins_change_users(authenticated_client, accounts):
+    root_id, root = accounts["root"]
+    _, bob = accounts["bob"]
+
+    assert authenticated_client.put(f"/admin/users/{root_id}", json={"is_active": False}, headers=bob).status_code == 403
+    assert authenticated_client.delete(f"/admin/users/{root_id}", headers=bob).status_code == 403
+    # Nor can an admin lock themselves out
+    assert authenticated_client.put(f"/admin/users/{root_id}", json={"is_active": False}, headers=root).status_code == 400
+    assert authenticated_client.delete(f"/admin/users/{root_id}", headers=root).status_code == 400
+
+
+def test_inactive_users_cannot_log_in(client, user, throttles, db):
+    user.is_active = False
+    db.commit()
+
+    assert login(client, PASSWORD).status_code == 401
@@ -0,0 +1,57 @@
+"""Statement counts of the catalogue listings, which must not grow with the page size."""
+
+import pytest
+
+from sqlalchemy import select
+
+from app import models
+
+
+@pytest.mark.parametrize("params", ["", "&available_only=true", "&with_total=true", "&search=luke"])
+def test_admin_list_bds_statements_do_not_grow_with_page_size(client, seed, statements, params):
+    seed(bds=120)
+    # Fill the count cache first, so that every counted request sees it warm
+    client.get(f"/admin/bds/?limit=1{params}")
+    counts = {}
+    for limit in (5, 20, 100):
+        statements.clear()
+        response = client.get(f"/admin/bds/?limit={limit}{params}")
+        assert response.status_code == 200
+        counts[limit] = len(statements)
+    assert counts[5] == counts[20] == counts[100], counts
+
+
+def test_admin_list_bds_rental_status(client, seed):
+    seed(bds=30, rent_every=3)
+    rows = client.get("/admin/bds/?limit=30&sort_field=bid").json()
+    rented = {row["bid"]: row["rented_by"] for row in rows if row["is_rented"]}
+    assert rented == {bid: f"Nom{bid % 20 + 1:03d} Prénom{bid % 20 + 1}" for bid in range(1, 31, 3)}
+
+
+def test_admin_list_bds_null_and_empty_placement(client, seed, db):
+    seed(bds=6, rent_every=100)
+    for bid, editeur in {1: "Dupuis", 2: "", 3: None, 4: "Casterman", 5: None, 6: ""}.items():
+        db.get(models.BD, bid).editeur = editeur
+    db.commit()
+
+    ascending = [row["editeur"] for row in client.get("/admin/bds/?sort_field=editeur&limit=10").json()]
+    assert ascending == ["Casterman", "Dupuis", "", "", None, None]
+    descending = [row["editeur"] for row in client.get("/admin/bds/?sort_field=editeur&sort_order=desc&limit=10").json()]
+    assert descending == list(reversed(ascending))
+
+
+@pytest.mark.parametrize("field, index", [
+    ("titreserie", "ix_bd_default_order"),
+    ("cote", "ix_bd_sort_cote"),
+    ("collection", "ix_bd_sort_collection"),
+])
+def test_sort_orders_read_their_index(seed, query_plan, field, index):
+    seed(bds=20)
+    keys = models.sort_key_expressions(getattr(models.BD, field))
+    if field == "titreserie":
+        keys.append(models.BD.numtome_sort)
+    for descending in (False, True):
+        order = [key.desc() if descending else key for key in keys + [models.BD.bid]]
+        plan = query_plan(select(models.BD.bid).order_by(*order).limit(10))
+        assert any(index in step for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.cache import ResponseCache
+
+
+def test_waiters_take_over_a_cancelled_load():
+    async def scenario():
+        cache = ResponseCache()
+        calls = []
+        started = asyncio.Event()
+
+        async def load():
+            calls.append(len(calls))
+            started.set()
+            await asyncio.sleep(0.05)
+            return b"page"
+
+        leader = asyncio.create_task(cache.get_or_load("key", load))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_load("key", load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results, calls, cache.get("key")
+
+    results, calls, cached = asyncio.run(scenario())
+
+    assert results == [b"page"] * 3
+    # The cancelled load, then a single load shared by the waiters
+    assert calls == [0, 1]
+    assert cached == b"page"
+
+
+def test_cancelled_waiter_leaves_the_load_running():
+    async def scenario():
+        cache = ResponseCache()
+        started = asyncio.Event()
+
+        async def load():
+            started.set()
+            await asyncio.sleep(0.05)
+            return b"page"
+
+        leader = asyncio.create_task(cache.get_or_load("key", load))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(scenario()) == b"page"
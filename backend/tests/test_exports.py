@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from app import exports
+
+
+@pytest.mark.parametrize("format", exports.FORMATS)
+def test_export_formats(client, seed, format):
+    seed(bds=5)
+
+    response = client.get("/admin/export/bds", params={"format": format})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(exports.MEDIA_TYPES[format].split(";")[0])
+    lines = response.text.strip().splitlines()
+    if format == "ndjson":
+        assert [json.loads(line)["bid"] for line in lines] == [1, 2, 3, 4, 5]
+    else:
+        assert len(lines) == 6
+
+
+def test_export_rejects_unknown_format(client, seed):
+    seed(bds=5)
+
+    assert client.get("/admin/export/bds", params={"format": "xml"}).status_code == 422
+    assert client.get("/admin/export/locations", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,78 @@
+"""Conditional requests on the public catalogue: ETags, 304s and the response cache."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.http_cache import catalogue_version
+
+
+@pytest.fixture
+def version_ttl(monkeypatch):
+    """Re-read the catalogue version on every request, as another worker's edit would eventually be seen."""
+    monkeypatch.setattr(catalogue_version, "ttl", 0)
+    catalogue_version.bump()
+
+
+def test_edit_by_another_worker_changes_etag_and_body(client, seed, db, version_ttl):
+    seed(bds=5)
+    first = client.get("/bds/?limit=5&sort_field=bid")
+    count = client.get("/bds/count")
+    assert first.json()[0]["titrealbum"] == "Album 1"
+
+    # Edited through another process: neither cache of this one is bumped
+    db.execute(text("UPDATE bd SET titrealbum = 'EDITED', date_modification = :now WHERE bid = 1"),
+               {"now": datetime(2030, 1, 1)})
+    db.execute(text("DELETE FROM bd WHERE bid = 5"))
+    db.commit()
+
+    second = client.get("/bds/?limit=5&sort_field=bid")
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()[0]["titrealbum"] == "EDITED"
+    assert client.get("/bds/count").json() == {"total": 4} != count.json()
+
+
+BD = {"cote": "NEW1", "titreserie": "Vasco", "scenariste": "Chaillet", "dessinateur": "Chaillet"}
+
+
+@pytest.mark.parametrize("path", ["/bds/?limit=5", "/bds/count", "/bds/1"])
+def test_revalidation_with_the_etag_gets_a_304(client, seed, path):
+    seed(bds=5)
+    first = client.get(path)
+    etag = first.headers["etag"]
+    assert "last-modified" not in first.headers
+
+    revalidated = client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    # Weak comparison, among several tags
+    assert client.get(path, headers={"If-None-Match": f'"other", {etag.removeprefix("W/")}'}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_if_modified_since_alone_is_not_enough_for_a_304(client, seed):
+    seed(bds=5)
+    assert client.get("/bds/", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}).status_code == 200
+
+
+@pytest.mark.parametrize("write", ["create", "update", "update twice", "delete"])
+def test_catalogue_writes_change_the_etag(client, seed, write):
+    seed(bds=5)
+    etag = client.get("/bds/").headers["etag"]
+
+    if write == "create":
+        assert client.post("/admin/bds/", json=BD).status_code == 200
+    elif write == "delete":
+        assert client.delete("/admin/bds/5").status_code == 200
+    else:
+        assert client.put("/admin/bds/1", json={**BD, "cote": "C00001"}).status_code == 200
+        if write == "update twice":
+            etag = client.get("/bds/").headers["etag"]
+            assert client.put("/admin/bds/1", json={**BD, "cote": "C00001", "titrealbum": "Again"}).status_code == 200
+
+    response = client.get("/bds/?limit=5", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
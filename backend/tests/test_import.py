@@ -0,0 +1,83 @@
+"""Bulk import of BDs from CSV and NDJSON uploads."""
+
+import json
+
+from sqlalchemy import func, select
+
+from app import models, stats
+
+HEADER = "cote,titreserie,titrealbum,numtome,scenariste,dessinateur,editeur,ISBN\n"
+
+
+def _import(client, body, content_type="text/csv"):
+    response = client.post("/admin/bds/import", content=body.encode(), headers={"Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_import_creates_bds(client, seed, db):
+    seed(bds=3)
+    report = _import(client, HEADER + (
+        "NEW1,Vasco,L'or et le fer,12,Chaillet,Chaillet,Lombard,\n"
+        "NEW2,,Le Transperceneige,HS,Lob,Rochette,,123456\n"
+    ))
+
+    assert report["created"] == 2 and report["rejected"] == 0
+    rows = {row.cote: row for row in db.execute(select(models.BD).where(models.BD.cote.in_(["NEW1", "NEW2"]))).scalars()}
+    assert rows["NEW1"].numtome_sort == models.tome_sort_key("12") == 12
+    assert rows["NEW2"].numtome_sort == models.tome_sort_key("HS")
+    # Empty cells: kept as "" in the series, which cannot be NULL, NULL elsewhere
+    assert rows["NEW2"].titreserie == ""
+    assert rows["NEW1"].ISBN is None and rows["NEW2"].editeur is None
+    assert rows["NEW2"].ISBN == 123456
+
+    # Searchable and counted right away
+    found = client.get("/bds/", params={"search": "transperceneige"}).json()
+    assert [bd["cote"] for bd in found] == ["NEW2"]
+    assert stats.counters(db)["bds"] == db.scalar(select(func.count()).select_from(models.BD)) == 5
+    assert client.get("/bds/count").json() == {"total": 5}
+
+
+def test_duplicate_cote_in_upload_is_rejected(client, seed):
+    seed(bds=3)
+    report = _import(client, HEADER + (
+        "NEW1,Vasco,A,1,Chaillet,Chaillet,,\n"
+        "NEW1,Vasco,B,2,Chaillet,Chaillet,,\n"
+    ))
+
+    assert report["created"] == 1
+    assert report["rows"][1] == {"row": 2, "status": "rejected", "cote": "NEW1", "errors": ["Duplicate cote in upload"]}
+
+
+def test_existing_cote_is_rejected(client, seed):
+    seed(bds=3)
+    report = _import(client, HEADER + "C00002,Vasco,A,1,Chaillet,Chaillet,,\nNEW1,Vasco,B,2,Chaillet,Chaillet,,\n")
+
+    assert [entry["status"] for entry in report["rows"]] == ["rejected", "created"]
+    assert report["rows"][0]["errors"] == ["Cote already exists"]
+
+
+def test_invalid_rows_are_reported_and_the_others_imported(client, seed):
+    seed(bds=3)
+    lines = [
+        json.dumps({"cote": "NEW1", "titreserie": "Vasco", "scenariste": "Chaillet", "dessinateur": "Chaillet"}),
+        json.dumps({"cote": "NEW2", "titreserie": "Vasco", "dessinateur": "Chaillet"}),
+        "{not json",
+        json.dumps(["NEW3"]),
+        json.dumps({"cote": "NEW4", "titreserie": "Vasco", "scenariste": "x", "dessinateur": "y", "ISBN": "abc"}),
+    ]
+    report = _import(client, "\n".join(lines) + "\n", "application/x-ndjson")
+
+    assert report["created"] == 1 and report["rejected"] == 4
+    rows = report["rows"]
+    assert rows[0]["status"] == "created"
+    assert rows[1]["errors"] == ["scenariste: Field required"]
+    assert rows[2]["errors"][0].startswith("Invalid JSON")
+    assert rows[3]["errors"] == ["Expected a JSON object"]
+    assert rows[4]["errors"][0].startswith("ISBN: ")
+
+
+def test_unknown_upload_type_is_refused(client, seed):
+    seed(bds=3)
+    response = client.post("/admin/bds/import", content=b"<bd/>", headers={"Content-Type": "application/xml"})
+    assert response.status_code == 415
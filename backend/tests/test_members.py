@@ -0,0 +1,31 @@
+"""The members page: one statement per page, whatever its size or sort."""
+
+import pytest
+
+
+@pytest.mark.parametrize("params", [
+    "",
+    "&sort_field=active_rentals&sort_order=desc",
+    "&sort_field=prenom",
+    "&search=nom0",
+    "&with_total=true",
+])
+def test_members_page_statements_do_not_grow_with_page_size(client, seed, statements, params):
+    seed(bds=120, members=100, rent_every=2)
+    # Fill the count cache first, so that every counted request sees it warm
+    client.get(f"/admin/membres/?limit=1{params}")
+    counts = {}
+    for limit in (5, 20, 100):
+        statements.clear()
+        response = client.get(f"/admin/membres/?limit={limit}{params}")
+        assert response.status_code == 200
+        counts[limit] = len(statements)
+    assert counts[5] == counts[20] == counts[100], counts
+
+
+def test_members_page_active_rentals(client, seed):
+    seed(bds=40, members=10, rent_every=2)
+    rows = client.get("/admin/membres/?limit=10&sort_field=active_rentals&sort_order=desc").json()
+    expected = {mid: sum(1 for bid in range(1, 41, 2) if bid % 10 + 1 == mid) for mid in range(1, 11)}
+    assert {row["mid"]: row["active_rentals"] for row in rows} == expected
+    assert [row["active_rentals"] for row in rows] == sorted(expected.values(), reverse=True)
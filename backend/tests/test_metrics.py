@@ -0,0 +1,39 @@
+import pytest
+
+from app import metrics
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", TOKEN)
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+def test_metrics_are_disabled_without_a_token(client):
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_metrics_require_the_token(client, metrics_token):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers=metrics_token)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+
+
+def test_ready_shows_pool_details_only_with_the_token(client, metrics_token):
+    assert set(client.get("/ready").json()) == {"ready"}
+    assert {"ready", "pool", "availability_loaded"} <= set(client.get("/ready", headers=metrics_token).json())
+
+
+def test_unknown_methods_share_one_label(client, metrics_token):
+    for method in ("FOO", "BAR", "PROPFIND"):
+        client.request(method, f"/nowhere-{method}")
+
+    body = client.get("/metrics", headers=metrics_token).text
+
+    assert 'method="other",route="unmatched"' in body
+    assert "FOO" not in body and "BAR" not in body and "PROPFIND" not in body
@@ -0,0 +1,116 @@
+"""The migration chain, run on a database created before any migration existed."""
+
+import os
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Boolean, Column, Date, ForeignKey, Integer, MetaData, String, Table, Text, TIMESTAMP, create_engine, inspect,
+    select, text
+)
+
+from app import models
+from app.migrations import MIGRATIONS, _index_names, run_migrations, schema_migrations
+
+# The tables as the models defined them before the first migration
+baseline = MetaData()
+Table(
+    "users", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("is_active", Boolean),
+    Column("is_admin", Boolean),
+    Column("created_at", TIMESTAMP),
+)
+Table(
+    "bd", baseline,
+    Column("bid", Integer, primary_key=True),
+    Column("cote", String(255), unique=True, nullable=False),
+    Column("titreserie", String(255), nullable=False),
+    Column("titrealbum", String(255)),
+    Column("numtome", String(20)),
+    Column("scenariste", String(255), nullable=False),
+    Column("dessinateur", String(255), nullable=False),
+    Column("collection", String(255)),
+    Column("editeur", String(255)),
+    Column("genre", String(200)),
+    Column("date_creation", TIMESTAMP),
+    Column("date_modification", TIMESTAMP),
+    Column("titre_norm", String(255)),
+    Column("serie_norm", String(255)),
+    Column("ISBN", Integer),
+)
+Table(
+    "membres", baseline,
+    Column("mid", Integer, primary_key=True),
+    Column("nom", String(255), nullable=False),
+    Column("prenom", String(255), nullable=False),
+    Column("gsm", String(15)),
+    Column("rue", String(255)),
+    Column("numero", Integer),
+    Column("boite", String(10)),
+    Column("codepostal", Integer),
+    Column("ville", String(255)),
+    Column("mail", String(50)),
+    Column("caution", Integer, nullable=False),
+    Column("remarque", Text),
+    Column("bdpass", String(10), nullable=False),
+    Column("abonnement", Date),
+    Column("vip", Boolean, nullable=False),
+    Column("IBAN", String(50)),
+    Column("groupe", String(255)),
+)
+Table(
+    "locations", baseline,
+    Column("lid", Integer, primary_key=True),
+    Column("bid", Integer, ForeignKey("bd.bid"), nullable=False),
+    Column("mid", Integer, ForeignKey("membres.mid"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("paye", Boolean, nullable=False),
+    Column("mail_rappel_1_envoye", Boolean, nullable=False),
+    Column("mail_rappel_2_envoye", Boolean, nullable=False),
+    Column("debut", TIMESTAMP, nullable=False),
+    Column("fin", TIMESTAMP),
+)
+
+
+def test_migrations_upgrade_a_baseline_database(tmp_path):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'baseline.db')}")
+    baseline.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(baseline.tables["bd"].insert(), [
+            {"bid": 1, "cote": "A1", "titreserie": "Vasco", "numtome": "2", "scenariste": "x", "dessinateur": "y"},
+            {"bid": 2, "cote": "A2", "titreserie": "", "numtome": "HS", "scenariste": "x", "dessinateur": "y"},
+        ])
+        conn.execute(baseline.tables["membres"].insert(), [
+            {"mid": 1, "nom": "Nom", "prenom": "Prénom", "caution": 10, "bdpass": "0", "vip": False},
+        ])
+        rental = {"mid": 1, "date": date(2024, 1, 1), "paye": False,
+                  "mail_rappel_1_envoye": False, "mail_rappel_2_envoye": False}
+        conn.execute(baseline.tables["locations"].insert(), [
+            # BD 1 was rented out twice without being returned
+            {**rental, "lid": 1, "bid": 1, "debut": datetime(2024, 1, 1)},
+            {**rental, "lid": 2, "bid": 1, "debut": datetime(2024, 2, 1)},
+            {**rental, "lid": 3, "bid": 2, "debut": datetime(2024, 3, 1), "fin": datetime(2024, 3, 8)},
+        ])
+
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+        assert applied == {version for version, _ in MIGRATIONS}
+        for table in (models.BD.__table__, models.Locations.__table__):
+            assert {index.name for index in table.indexes} <= _index_names(conn, table.name)
+        assert conn.execute(text("SELECT lid, fin FROM locations WHERE bid = 1 ORDER BY lid")).all() == [
+            (1, "2024-02-01 00:00:00.000000"), (2, None)
+        ]
+        assert conn.execute(text("SELECT nb_locations FROM membres")).scalar() == 3
+        assert conn.execute(text("SELECT numtome_sort FROM bd ORDER BY bid")).scalars().all() == [
+            2, models.tome_sort_key("HS")
+        ]
+        assert "open_bid" in {column["name"] for column in inspect(conn).get_columns("locations")}
+
+    # A second run has nothing left to apply
+    run_migrations(engine)
+    engine.dispose()
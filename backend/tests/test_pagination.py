@@ -0,0 +1,71 @@
+"""Keyset pagination of the catalogue: walking the cursors gives the same rows as offsets."""
+
+import pytest
+from sqlalchemy import text
+
+PAGE = 7
+
+SORTS = [
+    (field, order)
+    for field in (None, "bid", "cote", "titreserie", "numtome", "editeur", "collection", "genre", "date_creation")
+    for order in ("asc", "desc")
+]
+
+
+@pytest.fixture
+def catalogue(seed, db):
+    seed(bds=60)
+    # Ties, NULLs and empty strings in the sort columns
+    db.execute(text(
+        "UPDATE bd SET editeur = CASE bid % 3 WHEN 0 THEN 'Dupuis' WHEN 1 THEN '' ELSE NULL END, "
+        "collection = CASE WHEN bid % 5 = 0 THEN NULL ELSE 'Repérages' END, "
+        "genre = CASE WHEN bid % 2 = 0 THEN '' ELSE NULL END, "
+        "date_creation = CASE WHEN bid % 4 = 0 THEN '2021-06-01 00:00:00.000000' ELSE date_creation END"
+    ))
+    db.commit()
+
+
+def _walk(client, path, params):
+    bids, cursor = [], None
+    while True:
+        page_params = dict(params, limit=PAGE, **({"cursor": cursor} if cursor else {}))
+        response = client.get(path, params=page_params)
+        assert response.status_code == 200, response.text
+        bids += [bd["bid"] for bd in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return bids
+
+
+def _offsets(client, path, params):
+    bids, skip = [], 0
+    while True:
+        page = client.get(path, params=dict(params, limit=PAGE, skip=skip)).json()
+        bids += [bd["bid"] for bd in page]
+        if len(page) < PAGE:
+            return bids
+        skip += PAGE
+
+
+@pytest.mark.parametrize("path", ["/bds/", "/admin/bds/"])
+@pytest.mark.parametrize("sort_field, sort_order", SORTS)
+def test_cursor_pages_match_offset_pages(client, catalogue, path, sort_field, sort_order):
+    params = {"sort_order": sort_order, **({"sort_field": sort_field} if sort_field else {})}
+
+    by_cursor = _walk(client, path, params)
+
+    assert by_cursor == _offsets(client, path, params)
+    assert sorted(by_cursor) == list(range(1, 61))
+
+
+@pytest.mark.parametrize("params", [{"search": "vasco"}, {"available_only": "true"}])
+def test_cursor_pages_of_filtered_listings(client, catalogue, params):
+    assert _walk(client, "/admin/bds/", params) == _offsets(client, "/admin/bds/", params)
+
+
+def test_cursor_from_another_sort_is_rejected(client, catalogue):
+    cursor = client.get("/bds/", params={"limit": PAGE, "sort_field": "cote"}).headers["x-next-cursor"]
+
+    response = client.get("/bds/", params={"limit": PAGE, "sort_field": "editeur", "cursor": cursor})
+
+    assert response.status_code == 400
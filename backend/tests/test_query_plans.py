@@ -0,0 +1,146 @@
+"""
+Query plans, read with SQLite's EXPLAIN QUERY PLAN.
+
+The first test calls every endpoint, captures the statements they execute
+and checks that none of them reads the whole ``bd`` or ``locations`` table
+without an index, except those listed in ``FULL_SCANS``. The others build
+the hot rental lookups the way the application does and check that each one
+searches the index meant for it, so that a schema or query change that
+silently falls back to a table scan fails here.
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select
+
+from app import models
+from app.pagination import apply_sort, keyset_filter
+from app.routes import RENTAL_BD_COLUMNS, RENTAL_HISTORY_KEY
+
+Locations = models.Locations
+
+# Requests covering every endpoint that reads bd or locations, in an order
+# that leaves the data valid for the next one
+REQUESTS = [
+    ("GET", "/bds/?limit=10", None),
+    ("GET", "/bds/?limit=10&sort_field=titrealbum&sort_order=desc&with_total=true", None),
+    ("GET", "/bds/?limit=10&search=vasco", None),
+    ("GET", "/bds/?limit=10&search=va&with_total=true", None),
+    ("GET", "/bds/?limit=10&available_only=true&with_total=true", None),
+    ("GET", "/bds/count", None),
+    ("GET", "/bds/count?search=lucky", None),
+    ("GET", "/bds/7", None),
+    ("GET", "/admin/bds/?limit=10&with_total=true", None),
+    ("GET", "/admin/bds/?limit=10&sort_field=cote&sort_order=desc&available_only=true", None),
+    ("GET", "/admin/bds/?limit=10&search=as", None),
+    ("GET", "/admin/stats", None),
+    ("GET", "/admin/stats/series?metric=rentals&period=month&start=2023-01-01&end=2024-12-31", None),
+    ("GET", "/admin/stats/top?start=2023-01-01&end=2024-12-31", None),
+    ("GET", "/admin/membres/?limit=10&with_total=true", None),
+    ("GET", "/admin/membres/?limit=10&sort_field=active_rentals&sort_order=desc", None),
+    ("GET", "/admin/membres/count", None),
+    ("GET", "/admin/membres/3", None),
+    ("GET", "/admin/membres/3/rentals", None),
+    ("GET", "/admin/membres/3/rental-history?limit=5", None),
+    ("POST", "/admin/bds/", {"cote": "NEW1", "titreserie": "Vasco", "scenariste": "x", "dessinateur": "y"}),
+    ("PUT", "/admin/bds/2", {"cote": "C00002", "titreserie": "Vasco", "scenariste": "x", "dessinateur": "y"}),
+    ("POST", "/admin/membres/3/rent/2", None),
+    ("POST", "/admin/membres/3/rent", {"bids": [3, 5, 6, 404]}),
+    ("POST", "/admin/rentals/return", {"lids": [1, 2, 404]}),
+    ("DELETE", "/admin/bds/60", None),
+    ("GET", "/admin/export/bds", None),
+    ("GET", "/admin/export/locations?mid=3", None),
+    ("GET", "/admin/export/locations?open_only=true", None),
+]
+
+# Statements meant to read a whole table, by a pattern of their SQL, with why
+FULL_SCANS = {
+    # The catalogue version, read at most every CATALOGUE_VERSION_SECONDS per worker
+    r"max\(bd\.date_modification\)": "catalogue version",
+    # Search terms too short for the trigram index: LIKE '%..%' cannot use an index
+    r"LIKE lower\(\?\)": "short search term",
+    # The catalogue export streams every BD
+    r"FROM bd ORDER BY bd\.bid$": "catalogue export",
+}
+
+FULL_SCAN = re.compile(r"^SCAN (bd|locations)\b(?!.* USING (COVERING )?INDEX)")
+
+
+@pytest.fixture
+def executed(engine):
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_no_endpoint_scans_bd_or_locations(client, seed, db, executed):
+    seed(bds=60, members=20, closed_per_member=3)
+    violations = []
+    for method, path, body in REQUESTS:
+        executed.clear()
+        response = client.request(method, path, json=body)
+        assert response.status_code == 200, (path, response.text)
+        for statement, parameters in list(executed):
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+                continue
+            plan = [row[-1] for row in db.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )]
+            scans = [step for step in plan if FULL_SCAN.search(step)]
+            if scans and not any(re.search(pattern, statement) for pattern in FULL_SCANS):
+                violations.append((path, " ".join(statement.split()), plan))
+    assert not violations, "\n".join(map(str, violations))
+
+
+def _uses(plan, index):
+    return any(f"USING INDEX {index} " in step or f"USING COVERING INDEX {index} " in step for step in plan)
+
+
+def test_open_rental_by_bd_uses_bid_fin_index(seed, query_plan):
+    seed()
+    plan = query_plan(select(Locations.lid, Locations.mid).where(Locations.bid == 7, Locations.fin.is_(None)))
+    assert _uses(plan, "ix_locations_bid_fin"), plan
+
+
+def test_open_rentals_of_a_page_use_bid_fin_index(seed, query_plan):
+    seed()
+    plan = query_plan(select(Locations.bid).where(Locations.bid.in_([1, 2, 3, 4]), Locations.fin.is_(None)))
+    assert _uses(plan, "ix_locations_bid_fin"), plan
+
+
+def test_open_rentals_of_a_member_use_mid_fin_index(seed, query_plan):
+    seed()
+    plan = query_plan(
+        select(Locations.lid, models.BD.titrealbum)
+        .join(models.BD, Locations.bid == models.BD.bid)
+        .where(Locations.mid == 3, Locations.fin.is_(None))
+        .order_by(Locations.lid)
+    )
+    assert _uses(plan, "ix_locations_mid_fin"), plan
+
+
+def _history_page(mid):
+    query = select(Locations.lid, Locations.debut, *RENTAL_BD_COLUMNS).join(
+        models.BD, Locations.bid == models.BD.bid
+    ).where(Locations.mid == mid)
+    return apply_sort(query, RENTAL_HISTORY_KEY).limit(10)
+
+
+def test_rental_history_pages_read_the_mid_debut_index_in_order(seed, query_plan):
+    seed(members=5, closed_per_member=30)
+    first_page = query_plan(_history_page(3))
+    next_page = query_plan(_history_page(3).where(
+        keyset_filter(RENTAL_HISTORY_KEY, [datetime(2023, 12, 20, 9, 57), 40])
+    ))
+    for plan in (first_page, next_page):
+        assert _uses(plan, "ix_locations_mid_debut"), plan
+        # Rows come out of the index already sorted, newest first
+        assert not any("TEMP B-TREE" in step for step in plan), plan
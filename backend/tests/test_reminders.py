@@ -0,0 +1,129 @@
+"""The overdue reminders job, mailing through FileBackend."""
+
+from datetime import date, datetime, timedelta
+from email import message_from_bytes, policy
+
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.reminders import FileBackend, REMINDER_1_DAYS, REMINDER_2_DAYS, send_reminders
+
+TODAY = date(2024, 3, 1)
+FIRST = TODAY - timedelta(days=REMINDER_1_DAYS + 1)
+SECOND = TODAY - timedelta(days=REMINDER_2_DAYS + 1)
+RECENT = TODAY - timedelta(days=2)
+
+# (lid, mid, rented on, returned)
+RENTALS = [
+    (1, 1, FIRST, False), (2, 1, FIRST, False), (3, 1, FIRST, False),
+    (4, 2, SECOND, False), (5, 2, SECOND, False), (6, 2, FIRST, False),
+    (7, 3, RECENT, False), (8, 3, SECOND, True),
+    (9, 4, FIRST, False),
+]
+
+
+@pytest.fixture
+def overdue(db):
+    db.add_all(
+        models.Membres(mid=mid, nom=f"Nom{mid}", prenom=f"Prénom{mid}", caution=10,
+                       mail=f"m{mid}@example.com" if mid != 4 else None)
+        for mid in range(1, 5)
+    )
+    db.add_all(
+        models.BD(bid=lid, cote=f"C{lid:05d}", titreserie="Vasco", numtome=str(lid), titrealbum=f"Album {lid}",
+                  scenariste="Chaillet", dessinateur="Chaillet", date_creation=datetime(2020, 1, 1))
+        for lid, *_ in RENTALS
+    )
+    db.flush()
+    db.add_all(
+        models.Locations(lid=lid, bid=lid, mid=mid, date=rented_on, debut=datetime.combine(rented_on, datetime.min.time()),
+                         fin=datetime.combine(rented_on, datetime.min.time()) + timedelta(days=7) if returned else None)
+        for lid, mid, rented_on, returned in RENTALS
+    )
+    db.commit()
+
+
+def flags(db):
+    rows = db.execute(select(
+        models.Locations.lid, models.Locations.mail_rappel_1_envoye, models.Locations.mail_rappel_2_envoye
+    ).order_by(models.Locations.lid))
+    return {lid: (bool(first), bool(second)) for lid, first, second in rows}
+
+
+def mails(directory):
+    return sorted(
+        (message_from_bytes(path.read_bytes(), policy=policy.default) for path in directory.glob("*.eml")),
+        key=lambda message: message["To"]
+    )
+
+
+def test_reminders_are_sent_and_flagged(db, overdue, tmp_path):
+    report = send_reminders(db, FileBackend(tmp_path), TODAY)
+
+    assert report["mails_sent"] == 2
+    assert report["no_address"] == 1
+    assert report["rentals_flagged"] == 6
+    sent = mails(tmp_path)
+    assert [message["To"] for message in sent] == ["m1@example.com", "m2@example.com"]
+    assert "second rappel" not in sent[0]["Subject"]
+    assert "second rappel" in sent[1]["Subject"]
+    assert flags(db) == {
+        1: (True, False), 2: (True, False), 3: (True, False),
+        4: (True, True), 5: (True, True), 6: (True, False),
+        7: (False, False), 8: (False, False), 9: (False, False),
+    }
+
+
+def test_rerun_sends_no_duplicate(db, overdue, tmp_path):
+    send_reminders(db, FileBackend(tmp_path / "first"), TODAY)
+
+    report = send_reminders(db, FileBackend(tmp_path / "second"), TODAY)
+
+    assert report["mails_sent"] == 0
+    assert mails(tmp_path / "second") == []
+    # Later on, the second reminders and the newly overdue rentals are due
+    later = send_reminders(db, FileBackend(tmp_path / "later"), FIRST + timedelta(days=REMINDER_2_DAYS + 1))
+    assert [message["To"] for message in mails(tmp_path / "later")] == [
+        "m1@example.com", "m2@example.com", "m3@example.com"
+    ]
+    assert flags(db)[1] == (True, True)
+    assert flags(db)[7] == (True, False)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 4])
+def test_member_spanning_pages_gets_one_mail(db, overdue, tmp_path, chunk_rows):
+    report = send_reminders(db, FileBackend(tmp_path), TODAY, chunk_rows=chunk_rows)
+
+    assert report["mails_sent"] == 2
+    first, second = mails(tmp_path)
+    body = first.get_content()
+    assert [f"C0000{lid}" in body for lid in (1, 2, 3)] == [True, True, True]
+    assert all(f"C0000{lid}" in second.get_content() for lid in (4, 5, 6))
+
+
+class FailingBackend(FileBackend):
+    """Fails to send to one address."""
+
+    def __init__(self, directory, failing):
+        super().__init__(directory)
+        self.failing = failing
+
+    def send(self, message):
+        if message["To"] == self.failing:
+            raise OSError("Connection reset")
+        super().send(message)
+
+
+def test_failed_mail_is_retried_on_the_next_run(db, overdue, tmp_path):
+    report = send_reminders(db, FailingBackend(tmp_path / "first", "m1@example.com"), TODAY)
+
+    assert report["failed"] == 1
+    assert report["mails_sent"] == 1
+    assert [flags(db)[lid] for lid in (1, 2, 3)] == [(False, False)] * 3
+
+    retry = send_reminders(db, FileBackend(tmp_path / "retry"), TODAY)
+
+    assert retry["mails_sent"] == 1
+    assert [message["To"] for message in mails(tmp_path / "retry")] == ["m1@example.com"]
+    assert [flags(db)[lid] for lid in (1, 2, 3)] == [(True, False)] * 3
@@ -0,0 +1,124 @@
+"""Checkouts: the database, not the in-process index, decides who gets a BD, and the index follows it."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+
+from app.availability import availability_index
+
+THREADS = 8
+
+
+def test_concurrent_checkouts_of_one_bd_rent_it_once(client, seed, db):
+    seed(bds=10, members=THREADS, rent_every=100)
+
+    def rent(mid):
+        return client.post(f"/admin/membres/{mid}/rent/2").status_code
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        codes = list(pool.map(rent, range(1, THREADS + 1)))
+
+    assert sorted(codes) == [200] + [400] * (THREADS - 1)
+    assert db.execute(text("SELECT COUNT(*) FROM locations WHERE bid = 2 AND fin IS NULL")).scalar() == 1
+
+
+def test_batch_rejects_the_bds_rented_behind_its_back(client, seed, engine, db):
+    seed(bds=10, members=3, rent_every=100)
+    # BD 3 is rented by another writer right before the batch inserts, in a
+    # transaction of its own and without locking the BD
+    injected = []
+
+    def rent_behind_its_back(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO locations") and not injected:
+            injected.append(True)
+            cursor.execute(
+                "INSERT INTO locations (bid, mid, date, debut, paye, mail_rappel_1_envoye, mail_rappel_2_envoye)"
+                " VALUES (3, 2, ?, ?, 0, 0, 0)",
+                (datetime(2024, 1, 1).date().isoformat(), datetime(2024, 1, 1).isoformat(" "))
+            )
+            cursor.connection.commit()
+
+    event.listen(engine, "before_cursor_execute", rent_behind_its_back)
+    try:
+        response = client.post("/admin/membres/1/rent", json={"bids": [2, 3, 4]})
+    finally:
+        event.remove(engine, "before_cursor_execute", rent_behind_its_back)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rented"] == 2
+    assert [(item["bid"], item["status"]) for item in body["results"]] == [
+        (2, "rented"), (3, "rejected"), (4, "rented")
+    ]
+    assert body["results"][1]["errors"] == ["Book is already rented"]
+    assert availability_index.rental(db, 2)[1] == 1
+    assert db.execute(text("SELECT mid FROM locations WHERE bid = 3 AND fin IS NULL")).scalar() == 2
+
+
+def _open_rentals(db):
+    db.expire_all()
+    return {
+        bid: (lid, mid)
+        for bid, lid, mid in db.execute(text("SELECT bid, lid, mid FROM locations WHERE fin IS NULL"))
+    }
+
+
+def _available(db, search=None):
+    query = "SELECT bid FROM bd WHERE bid NOT IN (SELECT bid FROM locations WHERE fin IS NULL)"
+    if search:
+        query += " AND lower(titreserie) LIKE :pattern"
+    return {bid for (bid,) in db.execute(text(query), {"pattern": f"%{search}%"})}
+
+
+def _listed(client, search=None):
+    params = {"available_only": "true", "limit": 100, "with_total": "true"}
+    if search:
+        params["search"] = search
+    page = client.get("/bds/", params=params).json()
+    bids = {bd["bid"] for bd in page["items"]}
+    assert page["total"] == len(bids)
+    return bids
+
+
+@pytest.mark.parametrize("step", ["rent", "batch rent", "return", "batch return"])
+def test_the_availability_index_follows_the_desk(client, seed, db, step):
+    seed(bds=40, members=5, rent_every=3)
+    open_lids = sorted(lid for lid, _ in _open_rentals(db).values())
+
+    response = {
+        "rent": lambda: client.post("/admin/membres/1/rent/2"),
+        "batch rent": lambda: client.post("/admin/membres/2/rent", json={"bids": [2, 3, 4, 5, 404]}),
+        "return": lambda: client.post(f"/admin/rentals/{open_lids[0]}/return"),
+        "batch return": lambda: client.post("/admin/rentals/return", json={"lids": open_lids[:4] + [404]}),
+    }[step]()
+
+    assert response.status_code == 200
+    rentals = _open_rentals(db)
+    assert availability_index.rentals(db, range(1, 41)) == rentals
+    assert availability_index.rented_bids(db) == set(rentals)
+    for bid in (1, 2, 3, 4, 5):
+        assert availability_index.rental(db, bid) == rentals.get(bid)
+    assert _listed(client) == _available(db)
+    assert _listed(client, "vasco") == _available(db, "vasco")
+
+
+def test_available_only_follows_a_sequence_of_desk_operations(client, seed, db):
+    seed(bds=40, members=5, rent_every=3)
+    assert _listed(client) == _available(db)
+
+    lid = client.post("/admin/membres/1/rent/2").json()["rental_id"]
+    operations = [
+        lambda: client.post("/admin/membres/2/rent", json={"bids": [3, 5, 6]}),
+        lambda: client.post(f"/admin/rentals/{lid}/return"),
+        lambda: client.post("/admin/rentals/return", json={"lids": [_open_rentals(db)[1][0]]}),
+        # The BDs returned can be rented again
+        lambda: client.post("/admin/membres/3/rent", json={"bids": [1, 2]}),
+    ]
+    for operation in operations:
+        assert operation().status_code == 200
+        assert _listed(client) == _available(db)
+        assert _listed(client, "vasco") == _available(db, "vasco")
+
+    assert availability_index.rented_bids(db) == set(_open_rentals(db))
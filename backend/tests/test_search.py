@@ -0,0 +1,116 @@
+"""Catalogue search: short and common terms go to SQL, rebuilds do not block searches."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app import models, routes
+from app.search import SearchIndex
+
+
+def test_short_term_is_filtered_in_sql(client, seed, statements):
+    seed(bds=200)
+    statements.clear()
+    response = client.get("/admin/bds/?search=v&limit=10&with_total=true")
+    assert response.status_code == 200
+    page = response.json()
+    # Every "Vasco" album, and nothing else has a "v"
+    assert page["total"] == 50
+    assert {row["titreserie"] for row in page["items"]} == {"Vasco"}
+    # The 50 matches are never sent back as bound parameters, only the
+    # bids of the 10 rows of the page are
+    assert max(statement.count("?") for statement in statements) < 20
+    assert any("LIKE" in statement for statement in statements)
+
+
+def test_short_and_long_terms_agree(client, seed):
+    seed(bds=200)
+    short = client.get("/bds/count?search=Va").json()["total"]
+    long = client.get("/bds/count?search=vas").json()["total"]
+    assert short == long == 50
+
+
+def test_available_only_with_short_term(client, seed):
+    seed(bds=200, rent_every=4)
+    total = client.get("/admin/bds/?search=v&with_total=true&available_only=true&limit=1").json()["total"]
+    # Vasco is every 4th bid from 2, rentals every 4th bid from 1: none overlap
+    assert total == 50
+    total = client.get("/admin/bds/?search=lu&with_total=true&available_only=true&limit=1").json()["total"]
+    # Lucky Luke is every 4th bid from 1, all of them rented
+    assert total == 0
+
+
+@pytest.mark.parametrize("url, total", [
+    ("/bds/count?search=goscinny", 200),
+    ("/bds/?search=goscinny&with_total=true&limit=10", 200),
+    ("/bds/?search=goscinny&with_total=true&limit=10&available_only=true", 180),
+    ("/admin/bds/?search=goscinny&with_total=true&limit=10&available_only=true", 180),
+])
+def test_common_term_is_filtered_in_sql(client, seed, statements, monkeypatch, url, total):
+    seed(bds=200, rent_every=10)
+    monkeypatch.setattr(routes, "SEARCH_IN_LIMIT", 50)
+    statements.clear()
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.json()["total"] == total
+    # The 200 matches are not bound as an IN list, only the 20 rented bids
+    # and the bids of the page are
+    assert max(statement.count("?") for statement in statements) < 50
+    assert any("LIKE" in statement for statement in statements)
+
+
+def test_common_and_rare_terms_list_the_same_page(client, seed, monkeypatch):
+    seed(bds=200)
+    url = "/bds/?search=astérix&sort_field=titrealbum&sort_order=desc&limit=20"
+    listed = client.get(url)
+    monkeypatch.setattr(routes, "SEARCH_IN_LIMIT", 10)
+    routes.response_cache.bump()
+
+    filtered = client.get(url)
+
+    assert [bd["bid"] for bd in filtered.json()] == [bd["bid"] for bd in listed.json()]
+    assert filtered.headers["X-Next-Cursor"] == listed.headers["X-Next-Cursor"]
+
+
+class _SlowSession:
+    """Stands in for a session whose catalogue read waits until ``release`` is set."""
+
+    def __init__(self, db):
+        self.db = db
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def query(self, *columns):
+        rows = self.db.query(*columns).all()
+
+        def all():
+            self.reading.set()
+            self.release.wait(5)
+            return rows
+
+        return SimpleNamespace(all=all)
+
+
+def test_rebuild_does_not_block_searches(db, seed):
+    seed(bds=40)
+    index = SearchIndex(refresh_seconds=3600)
+    index.load(db)
+    slow = _SlowSession(db)
+    rebuild = threading.Thread(target=index.load, args=(slow,))
+    rebuild.start()
+    assert slow.reading.wait(5)
+
+    # Served from the previous index while the rebuild is still reading
+    index.refresh_seconds = 0
+    assert len(index.search(db, "vasco")) == 10
+    # An edit made during the rebuild survives the swap
+    index.upsert(models.BD(bid=999, cote="NEW", titreserie="Vasco"))
+
+    index.refresh_seconds = 3600
+    slow.release.set()
+    rebuild.join(5)
+    assert not rebuild.is_alive()
+    assert 999 in index.search(db, "vasco")
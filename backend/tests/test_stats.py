@@ -0,0 +1,90 @@
+from datetime import date
+
+from sqlalchemy import select, text
+
+from app import stats
+
+
+def _counters(db):
+    return dict(db.execute(select(stats.counters_table.c.name, stats.counters_table.c.value)).all())
+
+
+def test_portable_upsert_adds_to_existing_rows_and_inserts_new_ones(db):
+    stats.record(db, {"locations": 2}, [("rentals", date(2024, 1, 1), "", 2)])
+
+    stats._update_or_insert(db, stats.counters_table, ("name",), [
+        {"name": "locations", "value": 3},
+        {"name": "active_locations", "value": 1},
+    ])
+    stats._update_or_insert(db, stats.rollup_table, ("metric", "day", "dimension"), [
+        {"metric": "rentals", "day": date(2024, 1, 1), "dimension": "", "value": 1},
+        {"metric": "rentals", "day": date(2024, 1, 2), "dimension": "", "value": 4},
+    ])
+    db.commit()
+
+    assert _counters(db)["locations"] == 5
+    assert _counters(db)["active_locations"] == 1
+    rollup = stats.rollup_table
+    assert db.execute(select(rollup.c.day, rollup.c.value).order_by(rollup.c.day)).all() == [
+        (date(2024, 1, 1), 3), (date(2024, 1, 2), 4)
+    ]
+
+
+class _RacingSession:
+    """Inserts ``row`` through another statement right after the first UPDATE."""
+
+    def __init__(self, db, row):
+        self.db = db
+        self.row = row
+
+    def execute(self, statement, params=None):
+        result = self.db.execute(statement, params)
+        if self.row is not None:
+            self.db.execute(stats.counters_table.insert(), self.row)
+            self.row = None
+        return result
+
+    def begin_nested(self):
+        return self.db.begin_nested()
+
+
+def test_portable_upsert_recovers_from_a_concurrent_insert(db):
+    racing = _RacingSession(db, {"name": "extra", "value": 10})
+
+    stats._update_or_insert(racing, stats.counters_table, ("name",), [{"name": "extra", "value": 1}])
+    db.commit()
+
+    assert _counters(db)["extra"] == 11
+
+
+def _counted(db):
+    return {
+        "bds": db.execute(text("SELECT COUNT(*) FROM bd")).scalar(),
+        "membres": db.execute(text("SELECT COUNT(*) FROM membres")).scalar(),
+        "locations": db.execute(text("SELECT COUNT(*) FROM locations")).scalar(),
+        "active_locations": db.execute(text("SELECT COUNT(*) FROM locations WHERE fin IS NULL")).scalar(),
+    }
+
+
+def test_write_endpoints_keep_the_counters_exact(client, seed, db):
+    seed(bds=30, members=5)
+    assert stats.counters(db) == _counted(db)
+
+    bd = {"cote": "NEW1", "titreserie": "Vasco", "scenariste": "Chaillet", "dessinateur": "Chaillet"}
+    lid = client.post("/admin/membres/1/rent/2").json()["rental_id"]
+    writes = [
+        client.post("/admin/bds/", json=bd),
+        client.post("/admin/membres/", json={"nom": "Neuf", "prenom": "Membre", "caution": 10}),
+        client.post("/admin/membres/2/rent", json={"bids": [3, 5, 6, 4, 404]}),
+        client.post(f"/admin/rentals/{lid}/return"),
+        client.post("/admin/rentals/return", json={"lids": [1, 2, 404]}),
+        client.delete("/admin/bds/30"),
+    ]
+
+    assert [response.status_code for response in writes] == [200] * len(writes)
+    db.expire_all()
+    assert stats.counters(db) == _counted(db)
+    assert client.get("/admin/stats").json() | {"admin_user": None} == {
+        "total_bds": 30, "total_membres": 6, "total_locations": _counted(db)["locations"],
+        "active_locations": _counted(db)["active_locations"], "admin_user": None,
+    }
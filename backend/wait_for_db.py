@@ -1,21 +1,27 @@
 import os
 import time
 import sys
-from sqlalchemy import create_engine
+
+from app.database import create_db_engine
 
 
 def wait_for_db(url, timeout=60, interval=2):
-    engine = create_engine(url)
+    # Same engine settings as the app, so a database the app cannot use
+    # (bad driver options, pool settings, ...) also fails here
+    engine = create_db_engine(url, echo=False)
     end = time.time() + timeout
-    while time.time() < end:
-        try:
-            with engine.connect():
-                print("Database is available")
-                return True
-        except Exception as e:
-            print(f"Waiting for database ({e})...")
-            time.sleep(interval)
-    return False
+    try:
+        while time.time() < end:
+            try:
+                with engine.connect():
+                    print("Database is available")
+                    return True
+            except Exception as e:
+                print(f"Waiting for database ({e})...")
+                time.sleep(interval)
+        return False
+    finally:
+        engine.dispose()
 
 
 def main():
@@ -19,21 +19,16 @@ export const useMemberManagement = () => {
       const searchParam = search ? `&search=${encodeURIComponent(search)}` : '';
       const sortParam = `&sort_field=${sortField}&sort_order=${sortOrder}`;
       
-      const [membersResponse, countResponse] = await Promise.all([
-        fetch(`${API_BASE_URL}/admin/membres/?skip=${skip}&limit=${pageSize}${searchParam}${sortParam}`, {
-          headers: getAuthHeaders(),
-        }),
-        fetch(`${API_BASE_URL}/admin/membres/count?${searchParam.substring(1)}`, {
-          headers: getAuthHeaders(),
-        })
-      ]);
-
-      if (membersResponse.ok && countResponse.ok) {
+      const membersResponse = await fetch(
+        `${API_BASE_URL}/admin/membres/?skip=${skip}&limit=${pageSize}${searchParam}${sortParam}&with_total=true`,
+        { headers: getAuthHeaders() }
+      );
+
+      if (membersResponse.ok) {
         const membersData = await membersResponse.json();
-        const countData = await countResponse.json();
         return {
-          members: membersData,
-          total: countData.total
+          members: membersData.items,
+          total: membersData.total
         };
       } else {
         message.error('Erreur lors du chargement des membres');
@@ -118,21 +113,16 @@ export const useMemberManagement = () => {
       const skip = (page - 1) * pageSize;
       const searchParam = search ? `&search=${encodeURIComponent(search)}` : '';
       
-      const [bdsResponse, countResponse] = await Promise.all([
-        fetch(`${API_BASE_URL}/admin/bds/?skip=${skip}&limit=${pageSize}${searchParam}`, {
-          headers: getAuthHeaders(),
-        }),
-        fetch(`${API_BASE_URL}/bds/count?${searchParam.substring(1)}`, {
-          headers: getAuthHeaders(),
-        })
-      ]);
-
-      if (bdsResponse.ok && countResponse.ok) {
+      const bdsResponse = await fetch(
+        `${API_BASE_URL}/admin/bds/?skip=${skip}&limit=${pageSize}${searchParam}&with_total=true`,
+        { headers: getAuthHeaders() }
+      );
+
+      if (bdsResponse.ok) {
         const bdsData = await bdsResponse.json();
-        const countData = await countResponse.json();
         return {
-          bds: bdsData,
-          total: countData.total
+          bds: bdsData.items,
+          total: bdsData.total
         };
       } else {
         message.error('Erreur lors du chargement des BDs');
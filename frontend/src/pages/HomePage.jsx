@@ -26,6 +26,7 @@ const HomePage = () => {
   const [isInitialLoad, setIsInitialLoad] = useState(true);
   const [hasMore, setHasMore] = useState(true);
   const [currentPage, setCurrentPage] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [totalCount, setTotalCount] = useState(0);
   const [sortInfo, setSortInfo] = useState({});
   
@@ -130,26 +131,11 @@ const HomePage = () => {
     },
   ], []);
 
-  // Fetch total count
-  const fetchTotalCount = useCallback(async (search = '') => {
-    try {
-      const params = {};
-      if (search && search.trim()) {
-        params.search = search.trim();
-      }
-      
-      const response = await axios.get(`${API_BASE_URL}/bds/count`, { params });
-      return response.data.total || 0;
-    } catch (error) {
-      console.error('Error fetching total count:', error);
-      return 0;
-    }
-  }, []);
-
   // Fetch BDs from API
   const fetchBDs = useCallback(async (params = {}) => {
     const {
       page = 0,
+      cursor = null,
       search = searchTerm,
       sortField,
       sortOrder,
@@ -167,10 +153,18 @@ const HomePage = () => {
 
     try {
       const requestParams = {
-        skip: page * pageSize,
         limit: pageSize,
+        with_total: true,
       };
 
+      // Follow the keyset cursor of the previous page when scrolling,
+      // so deep pages cost the same as the first one
+      if (cursor) {
+        requestParams.cursor = cursor;
+      } else {
+        requestParams.skip = page * pageSize;
+      }
+
       if (search && search.trim()) {
         requestParams.search = search.trim();
       }
@@ -180,14 +174,12 @@ const HomePage = () => {
         requestParams.sort_order = sortOrder === 'ascend' ? 'asc' : 'desc';
       }
 
-      // Fetch both data and total count
-      const [dataResponse, totalCountResponse] = await Promise.all([
-        axios.get(`${API_BASE_URL}/bds/`, { params: requestParams }),
-        fetchTotalCount(search)
-      ]);
+      // Fetch the page and the total count in a single request
+      const dataResponse = await axios.get(`${API_BASE_URL}/bds/`, { params: requestParams });
 
-      const data = dataResponse.data || [];
-      const total = totalCountResponse;
+      const data = dataResponse.data.items || [];
+      const total = dataResponse.data.total || 0;
+      const cursorForNextPage = dataResponse.headers['x-next-cursor'] || null;
       
       if (append) {
         setBds(prev => [...prev, ...data]);
@@ -197,6 +189,7 @@ const HomePage = () => {
       
       setTotalCount(total);
       setHasMore(data.length === pageSize && (page + 1) * pageSize < total);
+      setNextCursor(cursorForNextPage);
       setCurrentPage(page);
 
     } catch (error) {
@@ -209,19 +202,20 @@ const HomePage = () => {
       setLoadingMore(false);
       setSearching(false);
     }
-  }, [searchTerm, fetchTotalCount, pageSize]);
+  }, [searchTerm, pageSize]);
 
   // Load more data when scrolling
   const loadMore = useCallback(() => {
     if (!loadingMore && hasMore) {
       fetchBDs({
         page: currentPage + 1,
+        cursor: nextCursor,
         search: searchTerm,
         ...sortInfo,
         append: true
       });
     }
-  }, [loadingMore, hasMore, currentPage, searchTerm, sortInfo, fetchBDs]);
+  }, [loadingMore, hasMore, currentPage, nextCursor, searchTerm, sortInfo, fetchBDs]);
 
   // Scroll event handler for infinite loading
   const handleScroll = useCallback((e) => {